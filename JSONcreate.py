@@ -1,7 +1,28 @@
 import json
-
+import queue
+import re
+import threading
+import time
+from collections import Counter
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from JSONregex import extract_patient_info
+from JSONregex import extract_vital_signs
+from JSONrepair import normalize_placeholders
+from JSONrepair import repair_json
+from JSONschema import PATIENT_INFO_KEYS
+from JSONschema import SYMPTOMS
+from JSONschema import TOP_LEVEL_KEYS
+from JSONschema import VISIT_MOTIVATIONS
+from JSONstream import StreamAborted
+from JSONvalidate import validate_extraction
+from LLMAPIs import REQUEST_ERRORS
 from LLMAPIs import get_response
+from LLMtrace import trace_event
 from pydantic import BaseModel
+from pydantic import field_validator
 
 class PatientInfo(BaseModel):
     patient_info: dict
@@ -19,21 +40,20 @@ class VitalSigns(BaseModel):
     temperature: dict | None
     respiratory_rate: dict | None
 
-def get_json_segment(model, notes):
-    visit_motivation = get_response(model,f"""
+PATIENT_INFO_PROMPT = """
     You are a strict information extraction system.
     Extract only the explicitly stated or directly implied information.
     Each visit_motivation must be one of the listed options.
     Return ONLY valid JSON (no extra text).
 
     Schema:
-    {{
-    "patient_info": {{
+    {
+    "patient_info": {
         "age": <number>,
         "gender": "Male" | "Female"
-    }},
+    },
     "visit_motivation": <string>  # single best matching condition from the list below
-    }}
+    }
 
     Possible values for "visit_motivation" are:
     ["Anemia", "Allergies", "Diabetes (Type 2)", "Tuberculosis (TB)", "Depression", "Asthma",
@@ -42,13 +62,9 @@ def get_json_segment(model, notes):
     "Pneumonia", "Urinary Tract Infection (UTI)", "Common Cold", "Ear Infection (Otitis Media)",
     "Eczema (Atopic Dermatitis)", "COVID-19", "Strep Throat", "Sinusitis", "Chronic Obstructive Pulmonary Disease (COPD)"]
 
-    ---
-    Medical Note:
-    {notes}
-    """,
-    format=PatientInfo)
-    
-    symptoms = get_response(model,f"""
+    """
+
+SYMPTOMS_PROMPT = """
 You are a strict information extraction system.
 
 Extract only the information that is explicitly stated or directly implied in the following medical note. 
@@ -58,7 +74,7 @@ Do NOT infer, guess, or add information that is not in the note.
 Return ONLY valid JSON (no text before or after).
 
     Respond ONLY with valid JSON in this format:
-    {{ "symptoms": [<list of symptoms>] }}
+    { "symptoms": [<list of symptoms>] }
 
     Possible symptoms:
     ["abdominal_pain", "anxiety", "blurred_vision", "chest_pain", "cough", "diarrhea", 
@@ -68,13 +84,9 @@ Return ONLY valid JSON (no text before or after).
     "night_sweats", "painful_urination", "pale_skin", "rash", "restlessness", "runny_nose", 
     "sadness", "sneezing", "sore_throat", "swollen_lymph_nodes", "vomiting", "weight_loss", "wheezing"]
 
-    ---
-    Medical Note:
-    {notes}
-    """,
-    format=Symptoms)
+    """
 
-    vital_signs = get_response(model,f"""
+VITAL_SIGNS_PROMPT = """
 You are a strict information extraction system.
 
 Extract only the information that is explicitly stated or directly implied in the following medical note. 
@@ -84,26 +96,52 @@ Do NOT infer, guess, or add information that is not in the note.
 Return ONLY valid JSON (no text before or after).
 
     Schema:
-    {{
-    "vital_signs": {{
-        "blood_pressure": {{
-        "systolic": {{ "value": <number>, "unit": "mmHg" }},
-        "diastolic": {{ "value": <number>, "unit": "mmHg" }}
-        }},
-        "heart_rate": {{ "value": <number>, "unit": "bpm" }},
-        "oxygen_saturation": {{ "value": <number>, "unit": "%" }},
-        "cholesterol_level": {{ "value": <number>, "unit": "mg/dL" }},
-        "glucose_level": {{ "value": <number>, "unit": "mg/dL" }},
-        "temperature": {{ "value": <number>, "unit": "°C" }},
-        "respiratory_rate": {{ "value": <number>, "unit": "breaths/min" }}
-    }}
-    }}
+    {
+    "vital_signs": {
+        "blood_pressure": {
+        "systolic": { "value": <number>, "unit": "mmHg" },
+        "diastolic": { "value": <number>, "unit": "mmHg" }
+        },
+        "heart_rate": { "value": <number>, "unit": "bpm" },
+        "oxygen_saturation": { "value": <number>, "unit": "%" },
+        "cholesterol_level": { "value": <number>, "unit": "mg/dL" },
+        "glucose_level": { "value": <number>, "unit": "mg/dL" },
+        "temperature": { "value": <number>, "unit": "°C" },
+        "respiratory_rate": { "value": <number>, "unit": "breaths/min" }
+    }
+    }
 
+    """
+
+SEGMENTS = [
+    ("patient_info", PATIENT_INFO_PROMPT, PatientInfo),
+    ("symptoms", SYMPTOMS_PROMPT, Symptoms),
+    ("vital_signs", VITAL_SIGNS_PROMPT, VitalSigns),
+]
+
+def get_json_segment(model, notes, workers=3, **kwargs):
+    """
+    Extracts the note in three independent segments and merges them.
+
+    With `workers` > 1 the segment requests are sent at the same time, so latency is close to the slowest segment
+    rather than the sum of all three. `workers=1` sends them one after another over the same connection.
+    Extra keyword arguments are passed to get_response.
+    """
+    user_prompt = f"""
     ---
     Medical Note:
     {notes}
-    """,
-    format=VitalSigns)
+    """
+
+    def run(segment):
+        name, system_prompt, format = segment
+        return get_response(model, system_prompt, user_prompt, format=format, **_with_tags(kwargs, segment=name))
+
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=min(workers, len(SEGMENTS))) as pool:
+            visit_motivation, symptoms, vital_signs = pool.map(run, SEGMENTS)
+    else:
+        visit_motivation, symptoms, vital_signs = map(run, SEGMENTS)
 
     visit_motivation_json = json.loads(visit_motivation.model_dump_json())
     symptoms_json = json.loads(symptoms.model_dump_json())
@@ -125,8 +163,7 @@ Return ONLY valid JSON (no text before or after).
 
     return json.dumps(response, separators=(',', ':'))
 
-def response_grabber(model, notes):
-    return get_response(model, system_prompt="""
+SYSTEM_PROMPT = """
 You are a medical information extraction AI. Convert unstructured clinical notes into a STRICT JSON object that conforms to the schema and rules below.
 
 OVERALL CONTRACT
@@ -223,26 +260,60 @@ SELF-AUDIT CHECKLIST (internal)
 
 EMPTY OUTPUT
 If no extractable data per schema → return {}
-""", user_prompt=f"""Extract structured medical data from the following clinical note according to the schema and rules defined in the system prompt.
+"""
+
+def response_grabber(model, notes, system_prompt=SYSTEM_PROMPT, **kwargs):
+    return get_response(model, system_prompt=system_prompt, user_prompt=f"""Extract structured medical data from the following clinical note according to the schema and rules defined in the system prompt.
 
 <<<NOTES
 {notes}
-NOTES""")
-
-def get_json_full(model, notes):
-    max_attempts = 3
-    for attempt in range(max_attempts):
-        response = response_grabber(model, notes)
-        try:
-            data = json.loads(response)
-            break  
-        except json.JSONDecodeError:
-            if attempt == max_attempts - 1:
-                # Last attempt failed
-                raise ValueError(f"Failed to get valid JSON after {max_attempts} attempts")
-            # Loop
-
-    # --- Strict vital signs cleanup ---
+NOTES""", **kwargs)
+
+FIX_JSON_PROMPT = """
+You repair malformed JSON. Return ONLY the corrected JSON object with the same keys and values.
+No prose, no code fences, no comments, no null values.
+"""
+
+# How often each path through get_json_full is taken (parsed, repaired, fix_request, aborted, retry, failed),
+# how many packed notes came back usable (packed) or were re-run alone (unpacked), and chunks extracted
+repair_stats = Counter()
+_repair_stats_lock = threading.Lock()
+
+def _with_tags(kwargs, **tags):
+    # get_response kwargs with trace tags merged over any the caller passed
+    return {**kwargs, 'tags': {**(kwargs.get('tags') or {}), **tags}}
+
+def _count(path, n=1, stats=repair_stats):
+    with _repair_stats_lock:
+        stats[path] += n
+
+def _recover_json(model, response, **kwargs):
+    """
+    Tries a local repair, then a short fix-this-JSON request, before falling back to full re-extraction.
+
+    An empty object counts as a failure, and text without any '{' (a refusal or plain prose) has nothing to fix,
+    so both go straight to re-extraction.
+    """
+    try:
+        data = repair_json(response)
+        if data:
+            _count('repaired')
+            return data
+    except json.JSONDecodeError:
+        pass
+    if '{' not in response:
+        return None
+    try:
+        data = repair_json(get_response(model, FIX_JSON_PROMPT, response, **_with_tags(kwargs, path='fix_json')))
+    except json.JSONDecodeError:
+        return None
+    if not data:
+        return None
+    _count('fix_request')
+    return data
+
+def clean_vital_signs(data):
+    """Drops vital sign readings without a usable value, in place."""
     if "vital_signs" in data:
         vital_signs = data["vital_signs"]
         cleaned_vitals = {}
@@ -274,5 +345,480 @@ def get_json_full(model, notes):
 
         data["vital_signs"] = cleaned_vitals
 
+def get_json_full(model, notes, system_prompt=SYSTEM_PROMPT, **kwargs):
+    max_attempts = 3
+    for attempt in range(max_attempts):
+        tagged = _with_tags(kwargs, path='full', attempt=attempt)
+        try:
+            # A retry must not be served the same cached bad response
+            response = response_grabber(model, notes, system_prompt, refresh=attempt > 0, **tagged)
+            data = json.loads(response)
+            _count('parsed')
+            break
+        except StreamAborted as error:
+            # The stream was cut short, so there is nothing complete to repair
+            _count('aborted')
+            trace_event('stream_aborted', model, tagged['tags'], error)
+        except json.JSONDecodeError as error:
+            trace_event('parse_failure', model, tagged['tags'], error)
+            data = _recover_json(model, response, **kwargs)
+            if data is not None:
+                break
+        if attempt == max_attempts - 1:
+            # Last attempt failed
+            _count('failed')
+            raise ValueError(f"Failed to get valid JSON after {max_attempts} attempts")
+        _count('retry')
+
+    clean_vital_signs(data)
+
     # Validate correct JSON
     return json.dumps(data, separators=(',', ':'))
+
+class VisitSymptoms(BaseModel):
+    visit_motivation: str
+    symptoms: list[str]
+
+class PatientVisitSymptoms(VisitSymptoms):
+    patient_info: dict
+
+HYBRID_PROMPT = f"""
+You are a strict information extraction system.
+Extract only the information that is explicitly stated or directly implied in the following medical note.
+Do NOT infer, guess, or add information that is not in the note.
+Return ONLY valid JSON (no text before or after).
+
+"visit_motivation" must be exactly one of:
+{json.dumps(VISIT_MOTIVATIONS)}
+
+"symptoms" is a list whose items must each be exactly one of:
+{json.dumps(SYMPTOMS)}
+"""
+
+HYBRID_PATIENT_PROMPT = HYBRID_PROMPT + """
+"patient_info" holds "age" (number) and "gender" ("Male" | "Female") only when explicitly stated.
+"""
+
+def get_json_hybrid(model, notes, **kwargs):
+    """
+    Fills patient_info and vital_signs with the regexes in JSONregex.py and only asks the model for the rest.
+
+    The model gets a much smaller prompt and schema than response_grabber: visit_motivation and symptoms, plus
+    patient_info unless the note states both age and gender explicitly ("Age: 56", "56-year-old", "Sex: F").
+    Explicit regex matches win over the model; weaker cues (a bare "male", a title) only fill keys the model
+    left out. Output follows the same cleanup rules as get_json_full. Extra keyword arguments are passed to
+    get_response.
+    """
+    patient_info = extract_patient_info(notes)
+    explicit = extract_patient_info(notes, explicit_only=True)
+    vital_signs = extract_vital_signs(notes)
+
+    user_prompt = f"""
+    ---
+    Medical Note:
+    {notes}
+    """
+    if len(explicit) == len(PATIENT_INFO_KEYS):
+        remainder = get_response(model, HYBRID_PROMPT, user_prompt, format=VisitSymptoms,
+                                 **_with_tags(kwargs, path='hybrid'))
+    else:
+        remainder = get_response(model, HYBRID_PATIENT_PROMPT, user_prompt, format=PatientVisitSymptoms,
+                                 **_with_tags(kwargs, path='hybrid'))
+    remainder = remainder.model_dump()
+
+    patient_info = {**patient_info, **normalize_placeholders(remainder.pop('patient_info', None) or {}), **explicit}
+    data = normalize_placeholders({'patient_info': patient_info, **remainder, 'vital_signs': vital_signs})
+    clean_vital_signs(data)
+
+    return json.dumps(data, separators=(',', ':'))
+
+# Notes seen by get_json_cascade, how many were escalated and why (invalid, low_agreement, error), and the wall
+# seconds spent in the fast and large model
+cascade_stats = Counter()
+
+def _regex_agreement(data, notes):
+    # Share of the explicit demographics and the vitals the regexes find that the extraction reports identically
+    expected = {'patient_info': extract_patient_info(notes, explicit_only=True),
+                'vital_signs': extract_vital_signs(notes)}
+    checked = agreed = 0
+    for section, fields in expected.items():
+        found = data.get(section) if isinstance(data.get(section), dict) else {}
+        for key, value in fields.items():
+            checked += 1
+            agreed += found.get(key) == value
+    return agreed / checked if checked else 1.
+
+def get_json_cascade(model, notes, fast_model='llama3.2', min_agreement=0.8, extract=get_json_full, **kwargs):
+    """
+    Extracts with `fast_model` first and only re-runs the note on `model` when the fast answer is not trusted.
+
+    The fast answer is escalated when `extract` fails, when JSONvalidate.validate_extraction finds any problem
+    (unknown keys, values outside the enums, non-atomic vitals, wrong types, implausible numbers), or when it
+    agrees with fewer than `min_agreement` of the explicit demographics and the vitals the JSONregex patterns find
+    in the note. Counts and timings accumulate in `cascade_stats`; cascade_report turns them into an escalation
+    rate and an estimate of the model time saved.
+
+    >>> extract_batch('gpt-oss', data['Note'], extract=get_json_cascade, fast_model='qwen2.5:3b')
+    >>> cascade_report()
+    """
+    start = time.perf_counter()
+    reason = None
+    try:
+        response = extract(fast_model, notes, **_with_tags(kwargs, cascade='fast'))
+        data = json.loads(response)
+        if validate_extraction(data):
+            reason = 'invalid'
+        elif _regex_agreement(data, notes) < min_agreement:
+            reason = 'low_agreement'
+    except Exception:
+        reason = 'error'
+    _count('notes', stats=cascade_stats)
+    _count('fast_seconds', time.perf_counter() - start, cascade_stats)
+    if reason is None:
+        return response
+
+    _count('escalated', stats=cascade_stats)
+    _count(reason, stats=cascade_stats)
+    start = time.perf_counter()
+    try:
+        return extract(model, notes, **_with_tags(kwargs, cascade='escalated', escalation=reason))
+    finally:
+        _count('large_seconds', time.perf_counter() - start, cascade_stats)
+
+def cascade_report(stats=cascade_stats):
+    """
+    Summarizes `cascade_stats`: escalation rate and reasons, seconds spent per model, and the seconds saved
+    compared with sending every note to the large model.
+
+    The large-model-only cost is estimated from the average time of the escalated notes, so it is only available
+    once at least one note has been escalated. Times are wall seconds per note, which include queueing when
+    notes run concurrently.
+    """
+    notes, escalated = stats['notes'], stats['escalated']
+    report = {
+        'notes': notes,
+        'escalated': escalated,
+        'escalation_rate': escalated / notes if notes else None,
+        'reasons': {reason: stats[reason] for reason in ('invalid', 'low_agreement', 'error') if stats[reason]},
+        'fast_seconds': stats['fast_seconds'],
+        'large_seconds': stats['large_seconds'],
+        'large_only_seconds': None,
+        'saved_seconds': None,
+        'saved_fraction': None,
+    }
+    if escalated:
+        large_only = stats['large_seconds'] / escalated * notes
+        saved = large_only - stats['fast_seconds'] - stats['large_seconds']
+        report.update(large_only_seconds=large_only, saved_seconds=saved, saved_fraction=saved / large_only)
+    return report
+
+class PackedItem(BaseModel):
+    # Ids are tagged without quotes in the prompt, so models often answer "id": 17
+    id: str
+    extraction: dict
+
+    @field_validator('id', mode='before')
+    @classmethod
+    def _id_as_string(cls, value):
+        return str(value)
+
+PACKED_PROMPT = SYSTEM_PROMPT + """
+MULTIPLE NOTES
+- The user message holds several clinical notes, each wrapped as <<<NOTE id=...>>> ... <<<END>>>.
+- Extract each note independently; never mix information between notes.
+- Return ONE JSON object: {"results": [{"id": "<note id>", "extraction": {<object following the schema>}}, ...]}
+- Include exactly one entry per note id, in the order the notes appear.
+"""
+
+def estimate_tokens(text):
+    """Rough token count for budgeting prompts (about four characters per token)."""
+    return len(text) // 4 + 1
+
+def pack_notes(notes, max_notes, token_budget=None):
+    """
+    Groups (id, note) pairs into packs of at most `max_notes` whose estimated note tokens fit `token_budget`.
+
+    A note that is over the budget on its own goes into a pack by itself. Full packs are yielded without waiting
+    for the next note, so a slow input never holds back work that is ready.
+    """
+    pack = []
+    tokens = 0
+    for note_id, note in notes:
+        cost = estimate_tokens(note)
+        if pack and token_budget is not None and tokens + cost > token_budget:
+            yield pack
+            pack, tokens = [], 0
+        pack.append((note_id, note))
+        tokens += cost
+        if len(pack) >= max_notes:
+            yield pack
+            pack, tokens = [], 0
+    if pack:
+        yield pack
+
+def get_json_packed(model, notes, extract=get_json_full, **kwargs):
+    """
+    Extracts several notes with one request, so the system prompt is processed once for the whole pack.
+
+    `notes` maps an id to its note text. The response is an array keyed by id, and each item is validated on its
+    own. Items that are missing, invalid or contain keys outside the schema are re-run one at a time with
+    `extract`. Returns a dict from id to the same JSON string `extract` would produce. Extra keyword arguments
+    go to `extract`; the packed request only gets those get_response accepts (client, cache, stream, ...).
+    get_json_cascade and get_json_chunked cannot be used, see iter_batch.
+    """
+    _check_packable(extract)
+    extracted = _extract_pack(model, notes, **kwargs)
+    results = {}
+    for note_id, note in notes.items():
+        if note_id in extracted:
+            results[note_id] = extracted[note_id]
+        else:
+            results[note_id] = extract(model, note, **kwargs)
+    return results
+
+# get_response keyword arguments the packed request passes on; the rest belong to the per-note extractor
+RESPONSE_KWARGS = ('client', 'cache', 'refresh', 'stream', 'tags', 'cancel')
+
+def _extract_pack(model, notes, **kwargs):
+    # Returns only the ids whose item came back valid
+    kwargs = {key: value for key, value in kwargs.items() if key in RESPONSE_KWARGS}
+    user_prompt = "Extract structured medical data from each of the following clinical notes according to the schema and rules defined in the system prompt.\n"
+    for note_id, note in notes.items():
+        user_prompt += f"\n<<<NOTE id={note_id}>>>\n{note}\n<<<END>>>\n"
+
+    try:
+        response = get_response(model, PACKED_PROMPT, user_prompt, **_with_tags(kwargs, path='packed', pack_size=len(notes)))
+        try:
+            data = json.loads(response)
+        except json.JSONDecodeError:
+            data = repair_json(response)
+        items = data.get('results', []) if isinstance(data, dict) else []
+    except json.JSONDecodeError:
+        items = []
+
+    extracted = {}
+    for item in items:
+        try:
+            item = PackedItem.model_validate(item)
+        except ValueError:
+            continue
+        if item.id not in notes or not set(item.extraction) <= set(TOP_LEVEL_KEYS):
+            continue
+        try:
+            clean_vital_signs(item.extraction)
+        except (AttributeError, TypeError):
+            # Vitals that are not objects (e.g. "blood_pressure": "120/80"): only this note is re-run
+            continue
+        extracted[item.id] = json.dumps(item.extraction, separators=(',', ':'))
+    _count('packed', len(extracted))
+    _count('unpacked', len(notes) - len(extracted))
+    return extracted
+
+# Lines that open a clinical section, e.g. "HPI:", "Vital Signs -", "Assessment/Plan:"
+SECTION_HEADER = re.compile(
+    r'^[ \t]*(?:chief complaint|cc|hpi|history of present illness|ros|review of systems|pmh|past medical history'
+    r'|psh|past surgical history|medications?|meds|allergies|social history|family history|triage|vitals?'
+    r'|vital signs|physical exam(?:ination)?|pe|exam|labs?|laboratory|results|imaging|assessment(?: ?(?:and|&|/) ?plan)?'
+    r'|a/p|plan|impression|diagnosis|discharge summary|hospital course|disposition|follow[- ]up)[ \t]*[:\-]',
+    re.I | re.M)
+
+def split_sections(notes):
+    """Splits a note in front of every section header line; text before the first header is its own section."""
+    starts = [match.start() for match in SECTION_HEADER.finditer(notes)]
+    bounds = [0] + [start for start in starts if start > 0] + [len(notes)]
+    return [notes[start:end] for start, end in zip(bounds, bounds[1:]) if notes[start:end].strip()]
+
+CHUNK_BREAKS = [re.compile(r'\n\s*\n'), re.compile(r'\n'), re.compile(r'(?<=[.!?;])\s+')]
+
+def _split_oversized(section, token_budget, breaks=CHUNK_BREAKS):
+    # Paragraphs, then lines, then sentences, then plain character windows, whichever first fits the budget
+    for depth, pattern in enumerate(breaks):
+        pieces = [piece for piece in pattern.split(section) if piece.strip()]
+        if len(pieces) > 1:
+            chunks = []
+            for piece in pieces:
+                fits = estimate_tokens(piece) <= token_budget
+                chunks += [piece] if fits else _split_oversized(piece, token_budget, breaks[depth + 1:])
+            return chunks
+    width = max(1, token_budget - 1) * 4
+    return [section[i:i + width] for i in range(0, len(section), width)]
+
+def chunk_note(notes, token_budget):
+    """Groups consecutive sections of a note into chunks of at most `token_budget` estimated tokens."""
+    chunks = []
+    current = ''
+    for section in split_sections(notes):
+        pieces = _split_oversized(section, token_budget) if estimate_tokens(section) > token_budget else [section]
+        for piece in pieces:
+            # Sections keep their trailing newline; pieces split out of a section lost their separator
+            joined = current + ('' if current[-1:].isspace() else ' ') + piece if current else piece
+            if current and estimate_tokens(joined) > token_budget:
+                chunks.append(current)
+                joined = piece
+            current = joined
+    if current:
+        chunks.append(current)
+    return chunks
+
+def _atomic(reading):
+    return isinstance(reading, dict) and reading.get('value') not in [None, "#", "", "null"] and bool(reading.get('unit'))
+
+def merge_extractions(parts):
+    """
+    Merges extractions of consecutive chunks of one note, in note order.
+
+    Follows SYSTEM_PROMPT's priority rules: the last explicit age and gender win, the last visit_motivation wins,
+    symptoms are united in order of first mention, and each vital sign keeps its last atomic reading (blood
+    pressure only with both systolic and diastolic).
+    """
+    patient_info = {}
+    visit_motivation = None
+    symptoms = []
+    vital_signs = {}
+    for part in parts:
+        for key, value in (part.get('patient_info') or {}).items():
+            if key in PATIENT_INFO_KEYS and value not in [None, "#", "", "null"]:
+                patient_info[key] = value
+        if part.get('visit_motivation'):
+            visit_motivation = part['visit_motivation']
+        symptoms += [symptom for symptom in part.get('symptoms') or [] if symptom not in symptoms]
+        for key, reading in (part.get('vital_signs') or {}).items():
+            if key == 'blood_pressure':
+                if isinstance(reading, dict) and all(_atomic(reading.get(p)) for p in ('systolic', 'diastolic')):
+                    vital_signs[key] = {p: reading[p] for p in ('systolic', 'diastolic')}
+            elif _atomic(reading):
+                vital_signs[key] = reading
+
+    data = {'patient_info': patient_info, 'visit_motivation': visit_motivation, 'symptoms': symptoms,
+            'vital_signs': vital_signs}
+    return {key: value for key, value in data.items() if value}
+
+def get_json_chunked(model, notes, chunk_budget=1500, workers=4, extract=get_json_full, **kwargs):
+    """
+    Extracts a long note chunk by chunk so prompt size, and with it prefill time, is bounded by `chunk_budget`.
+
+    Notes within the budget go straight to `extract`. Longer notes are split along clinical section headers
+    (HPI, Vitals, Assessment/Plan, ...) with chunk_note, the chunks are extracted on up to `workers` threads,
+    and the partial results are combined with merge_extractions.
+    """
+    if estimate_tokens(notes) <= chunk_budget:
+        return extract(model, notes, **kwargs)
+    chunks = chunk_note(notes, chunk_budget)
+
+    def run(index):
+        return json.loads(extract(model, chunks[index], **_with_tags(kwargs, path='chunk', chunk=index)))
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(chunks)))) as pool:
+        parts = list(pool.map(run, range(len(chunks))))
+    _count('chunks', len(chunks))
+    return json.dumps(merge_extractions(parts), separators=(',', ':'))
+
+def _check_packable(extract):
+    if extract in (get_json_cascade, get_json_chunked):
+        raise ValueError(f'{extract.__name__} cannot be packed; use pack=1')
+
+@dataclass
+class BatchResult:
+    index: int
+    json: str | None
+    error: Exception | None
+    seconds: float
+
+    @property
+    def ok(self):
+        return self.error is None
+
+def iter_batch(model, notes, concurrency=4, extract=get_json_full, pack=1, token_budget=None, **kwargs):
+    """
+    Runs `extract` over an iterable of notes on a thread pool and yields a BatchResult per note, in input order.
+
+    At most `concurrency` notes are extracted at once and at most twice that many are read ahead, so
+    arbitrarily long iterables can be streamed. Each note sends as many requests at a time as `extract` does:
+    one for get_json_full, up to three for get_json_segment and up to `workers` for get_json_chunked. Pass
+    workers=1 through the keyword arguments to keep requests in flight down to `concurrency`.
+
+    Notes are read on a separate thread, so a finished result is yielded right away even while the next note
+    is slow to arrive (e.g. a pipe on stdin). A failing note yields a BatchResult carrying the exception instead
+    of stopping the batch.
+
+    With `pack` > 1, up to `pack` notes (capped by `token_budget` estimated note tokens) share one request
+    through get_json_packed, and `extract` only handles the notes that come back missing or invalid. Every
+    note in a pack reports the pack's wall time. A pack that fails on the network or server side is re-run
+    note by note. Packing cannot be combined with get_json_cascade, whose point is to try the fast model first,
+    or get_json_chunked, whose point is to keep prompts small; both raise ValueError.
+    """
+    if pack > 1:
+        _check_packable(extract)
+
+    def run_single(index, note):
+        start = time.perf_counter()
+        try:
+            result = extract(model, note, **kwargs)
+            return BatchResult(index, result, None, time.perf_counter() - start)
+        except Exception as error:
+            return BatchResult(index, None, error, time.perf_counter() - start)
+
+    def run(job):
+        if pack <= 1:
+            return [run_single(index, note) for index, note in job]
+        start = time.perf_counter()
+        try:
+            packed = _extract_pack(model, {str(index): note for index, note in job}, **kwargs)
+        except REQUEST_ERRORS:
+            packed = {}
+        seconds = time.perf_counter() - start
+        return [BatchResult(index, packed[str(index)], None, seconds) if str(index) in packed
+                else run_single(index, note) for index, note in job]
+
+    jobs = pack_notes(enumerate(notes), max(pack, 1), token_budget if pack > 1 else None)
+    # The reader thread posts ('job', job) and finally ('end', error); finished requests post ('done', None)
+    events = queue.Queue()
+    read_ahead = threading.Semaphore(2 * concurrency)
+    stopped = threading.Event()
+
+    def read():
+        try:
+            for job in jobs:
+                read_ahead.acquire()
+                if stopped.is_set():
+                    return
+                events.put(('job', job))
+        except Exception as error:
+            events.put(('end', error))
+        else:
+            events.put(('end', None))
+
+    pending = deque()
+    finished = False
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        # Daemon, so a reader blocked on input that never comes does not keep the process alive
+        threading.Thread(target=read, daemon=True).start()
+        try:
+            while pending or not finished:
+                if pending and (finished or pending[0].done()):
+                    yield from pending.popleft().result()
+                    read_ahead.release()
+                    continue
+                kind, value = events.get()
+                if kind == 'job':
+                    pending.append(pool.submit(run, value))
+                    pending[-1].add_done_callback(lambda _: events.put(('done', None)))
+                elif kind == 'end':
+                    finished = True
+                    if value is not None:
+                        raise value
+        finally:
+            # Consumer stopped early: stop reading and drop anything that has not started yet
+            stopped.set()
+            read_ahead.release()
+            for future in pending:
+                future.cancel()
+
+def extract_batch(model, notes, concurrency=4, extract=get_json_full, pack=1, token_budget=None, **kwargs):
+    """
+    Extracts JSON for every note concurrently and returns a list of BatchResult in input order.
+
+    >>> results = extract_batch('gpt-oss', data['Note'], concurrency=4)
+    >>> [r.json for r in results if r.ok]
+    """
+    return list(iter_batch(model, notes, concurrency, extract, pack, token_budget, **kwargs))
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import re
+import unicodedata
+import zlib
+from dataclasses import dataclass
+
+import numpy as np
+
+from JSONcreate import BatchResult
+from JSONcreate import extract_batch
+from JSONcreate import get_json_full
+from JSONregex import extract_patient_info
+from JSONregex import extract_vital_signs
+
+# Largest prime below 2**32; with multipliers below 2**31 every hash stays inside uint64
+_PRIME = np.uint64(4294967291)
+_WORD = re.compile(r'\w+')
+
+def normalize_note(text):
+    """Unicode-normalizes, lowercases and collapses whitespace, so formatting-only differences compare equal."""
+    return ' '.join(unicodedata.normalize('NFKC', text).lower().split())
+
+def _digest(text):
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+def _shingles(text, size):
+    words = _WORD.findall(text)
+    if len(words) <= size:
+        return {zlib.crc32(' '.join(words).encode('utf-8'))}
+    return {zlib.crc32(' '.join(words[i:i + size]).encode('utf-8')) for i in range(len(words) - size + 1)}
+
+@dataclass
+class DuplicateIndex:
+    """
+    Where every note's result can come from.
+
+    `exact[i]` is the index of the first note with the same normalized text (i itself for first occurrences).
+    `near[i]` is the index of an earlier, distinct note whose estimated Jaccard similarity is at least the
+    threshold, or -1, and `similarity[i]` is that estimate.
+    """
+    exact: np.ndarray
+    near: np.ndarray
+    similarity: np.ndarray
+
+    def stats(self):
+        n = len(self.exact)
+        exact = int((self.exact != np.arange(n)).sum())
+        near = int((self.near >= 0).sum())
+        return {'notes': n, 'exact_duplicates': exact, 'near_duplicates': near, 'unique': n - exact - near}
+
+def find_duplicates(notes, threshold=0.8, num_perm=64, bands=8, shingle_size=3, seed=1):
+    """
+    Finds exact duplicates by hashing normalized text and near duplicates with MinHash and LSH banding.
+
+    Only first occurrences get a MinHash signature, kept as one (unique notes x num_perm) uint32 array, so
+    memory is about 4 * num_perm bytes per unique note plus one 8-byte digest each. `bands` splits the signature
+    for LSH; with the defaults pairs above roughly 0.77 Jaccard similarity become candidates, and candidates are
+    kept only if their signatures agree on at least `threshold` of the positions.
+
+    >>> find_duplicates(['BP 120/80.', 'bp  120/80.', 'Something else entirely']).stats()
+    {'notes': 3, 'exact_duplicates': 1, 'near_duplicates': 0, 'unique': 2}
+    """
+    if num_perm % bands:
+        raise ValueError('num_perm must be a multiple of bands')
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2 ** 31, num_perm, dtype=np.uint64)
+    b = rng.integers(0, 2 ** 31, num_perm, dtype=np.uint64)
+
+    first = {}
+    exact = []
+    representatives = []
+    signatures = []
+    for index, note in enumerate(notes):
+        text = normalize_note(note)
+        original = first.setdefault(_digest(text), index)
+        exact.append(original)
+        if original == index:
+            shingles = np.fromiter(_shingles(text, shingle_size), np.uint64)
+            signatures.append(((shingles[:, None] * a + b) % _PRIME).min(axis=0).astype(np.uint32))
+            representatives.append(index)
+
+    n = len(exact)
+    near = np.full(n, -1, np.int64)
+    similarity = np.zeros(n, np.float32)
+    if signatures:
+        signatures = np.stack(signatures)
+        representatives = np.array(representatives, np.int64)
+        rows = num_perm // bands
+        # For each representative, the earliest earlier representative sharing a band that passes the threshold
+        best = np.full(len(representatives), -1, np.int64)
+        for band in range(bands):
+            keys = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+            _, group_first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+            candidate = group_first[inverse.reshape(-1)]
+            rows_with_match = np.flatnonzero(candidate < np.arange(len(candidate)))
+            agreement = (signatures[rows_with_match] == signatures[candidate[rows_with_match]]).mean(axis=1)
+            for row, other, score in zip(rows_with_match, candidate[rows_with_match], agreement):
+                if score >= threshold and (best[row] < 0 or other < best[row]):
+                    best[row] = other
+                    similarity[representatives[row]] = score
+        matched = best >= 0
+        near[representatives[matched]] = representatives[best[matched]]
+    return DuplicateIndex(np.array(exact, np.int64), near, similarity)
+
+def _reuse_near(result, note):
+    # Cheap verification: keep the model's visit_motivation and symptoms, re-read demographics and vitals
+    data = json.loads(result)
+    patient_info = extract_patient_info(note)
+    vital_signs = extract_vital_signs(note)
+    data.pop('vital_signs', None)
+    if patient_info:
+        data['patient_info'] = patient_info
+    else:
+        data.pop('patient_info', None)
+    if vital_signs:
+        data['vital_signs'] = vital_signs
+    return json.dumps(data, separators=(',', ':'))
+
+def extract_deduplicated(model, notes, concurrency=4, extract=get_json_full, threshold=0.8, near='flag', **kwargs):
+    """
+    Runs extract_batch only on distinct notes and fills in the rest, returning (results, DuplicateIndex).
+
+    Exact duplicates (after normalize_note) reuse the first occurrence's result. Near duplicates are handled
+    according to `near`: 'flag' extracts them normally (the index marks them), 'reuse' copies the similar note's
+    visit_motivation and symptoms and re-reads demographics and vitals from the note itself with JSONregex,
+    without a model call. Results are BatchResult objects in input order; reused ones report 0 seconds.
+
+    >>> results, index = extract_deduplicated('gpt-oss', data['Note'], near='reuse')
+    >>> index.stats()
+    """
+    if near not in ('flag', 'reuse'):
+        raise ValueError("near must be 'flag' or 'reuse'")
+    notes = list(notes)
+    index = find_duplicates(notes, threshold)
+    source = index.exact.copy()
+    if near == 'reuse':
+        reusable = (index.near >= 0) & (source == np.arange(len(notes)))
+        source[reusable] = index.exact[index.near[reusable]]
+    todo = np.flatnonzero(source == np.arange(len(notes)))
+
+    results = [None] * len(notes)
+    for result in extract_batch(model, [notes[i] for i in todo], concurrency, extract, **kwargs):
+        position = int(todo[result.index])
+        results[position] = BatchResult(position, result.json, result.error, result.seconds)
+    for position, origin in enumerate(source):
+        if results[position] is not None:
+            continue
+        original = results[origin]
+        if original.ok and origin != index.exact[position]:
+            results[position] = BatchResult(position, _reuse_near(original.json, notes[position]), None, 0.)
+        else:
+            results[position] = BatchResult(position, original.json, original.error, 0.)
+    return results, index
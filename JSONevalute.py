@@ -8,11 +8,21 @@ Your metric must satisfy the following constraints:
 - score must return a single, finite, non-null float.
 """
 
-import pandas as pd
-import pandas.api.types
+from __future__ import annotations
+
 import math
 import json
-import numpy as np
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from statistics import NormalDist
+from typing import TYPE_CHECKING
+
+from JSONschema import VITALS
+
+if TYPE_CHECKING:
+    # Only needed for the annotations, so compare_json can be imported without loading pandas
+    import pandas as pd
 
 
 class ParticipantVisibleError(Exception):
@@ -255,4 +265,285 @@ def score(solution: pd.DataFrame, submission: pd.DataFrame, row_id_column_name:
             res+=float(score)
         res = res / len(solution)
         total += res
-    return total / len(matched_cols)
\ No newline at end of file
+    return total / len(matched_cols)
+
+@lru_cache(maxsize=65536)
+def _string_similarity(a, b):
+    max_len = max(len(a), len(b))
+    if max_len == 0:
+        return 1.
+    return sum(map(str.__eq__, a, b)) / max_len
+
+
+_NUMBER_TYPES = (int, float, bool)
+
+
+def _compare_json_fast(a, b, key_weight, value_weight, alpha):
+    # Mirrors compare_json branch for branch (including set iteration order and summation order), so scores are
+    # bit-identical. It dispatches on the exact types json.loads produces before falling back to the generic
+    # checks, and memoises string similarities, which repeat constantly for enums and units.
+    type_a = type(a)
+    type_b = type(b)
+    if type_a is str and type_b is str:
+        return _string_similarity(a, b)
+    if type_a is dict and type_b is dict:
+        keys_a = set(a.keys())
+        keys_b = set(b.keys())
+        all_keys = keys_a | keys_b
+        if not all_keys:
+            return 1.
+        key_similarity = len(keys_a & keys_b) / len(all_keys)
+        value_similarities = [
+            _compare_json_fast(a[key], b[key], key_weight, value_weight, alpha) if key in a and key in b else 0
+            for key in all_keys
+        ]
+        value_similarity = sum(value_similarities) / len(value_similarities)
+        return key_weight * key_similarity + value_weight * value_similarity
+    if type_a in _NUMBER_TYPES and type_b in _NUMBER_TYPES:
+        return math.exp(-alpha * abs(a - b))
+    if type_a is list and type_b is list:
+        a = set(a)
+        b = set(b)
+        max_len = max(len(a), len(b))
+        if max_len == 0:
+            return 1.
+        return len(a & b) / max_len
+    return compare_json(a, b, key_weight, value_weight, alpha)
+
+
+def _score_chunk(args):
+    # Runs in a worker process: parse each cell once, then score the pair
+    submissions, solutions, key_weight, value_weight, alpha, verbose = args
+    scores = []
+    for sub, sol in zip(submissions, solutions):
+        sub = to_json(sub) if verbose else _parse_json(sub)
+        sol = to_json(sol) if verbose else _parse_json(sol)
+        scores.append(float(_compare_json_fast(sub, sol, key_weight, value_weight, alpha)))
+    return scores
+
+
+def _parse_json(s):
+    try:
+        return json.loads(s)
+    except Exception:
+        return ''
+
+
+def score_fast(solution: pd.DataFrame, submission: pd.DataFrame, row_id_column_name: str, processes: int = None,
+               chunk_size: int = 2000, key_weight: float = 0.25, value_weight: float = 0.75, alpha: float = 1.,
+               legacy: bool = False, schema: bool = False) -> float:
+    '''
+    Drop-in replacement for `score` that spreads rows over a process pool.
+
+    Every cell is parsed once and scored with the same rules as `compare_json`, and the per-row scores are summed
+    in the same order as `score`, so the result is identical. `key_weight`, `value_weight` and `alpha` have the
+    same meaning as in `compare_json`. The input DataFrames are left untouched and failed parses are silent. Set `legacy=True` to get the old
+    side effects back: the row id column is deleted from both inputs and every unparsable cell is printed.
+    `processes` defaults to the CPU count; with one process, or inputs shorter than `chunk_size`, rows are scored
+    in the calling process.
+
+    `schema=True` scores each column with JSONvector.compare_json_vectorized instead, which agrees with `score`
+    up to floating-point rounding. It is not faster on JSON-string cells, since the strings are parsed and
+    flattened on every call; the speedup comes from calling compare_json_vectorized directly with SchemaColumns
+    that were encoded once and reused, for example a ground truth scored against many submissions.
+
+    Example:
+    >>> import pandas as pd
+    >>> json1 = """{"a": 10, "b": "Test", "c": {"a": -312.414, "z": [1,2,3]}}"""
+    >>> json2 = """{"a": 0, "b": "Test", "c": {"a": -312.414, "z": [3,2,1]}}"""
+    >>> y_pred = pd.DataFrame([json1, json2])
+    >>> y_pred["id"] = range(len(y_pred))
+    >>> y_true = pd.DataFrame([json2, json1])
+    >>> y_true["id"] = range(len(y_true))
+    >>> score_fast(y_true, y_pred, "id")
+    0.7500113499824406
+    '''
+    if legacy:
+        del solution[row_id_column_name]
+        del submission[row_id_column_name]
+    columns = [col for col in solution.columns if col != row_id_column_name]
+    submitted = [col for col in submission.columns if col != row_id_column_name]
+
+    matched_cols = [col for col in submitted if col in columns]
+    if len(matched_cols) != len(columns):
+        raise ParticipantVisibleError(f'Submission does not contains expected columns: {",".join([x for x in columns])}')
+
+    if schema:
+        from JSONvector import compare_json_vectorized
+        parse = to_json if legacy else _parse_json
+        chunks = [compare_json_vectorized([parse(x) for x in submission[match].values],
+                                          [parse(x) for x in solution[match].values],
+                                          key_weight, value_weight, alpha).tolist()
+                  for match in columns]
+        chunk_size = max(len(solution), 1)
+        return _average(chunks, columns, len(solution), chunk_size)
+
+    tasks = []
+    for match in columns:
+        submissions = submission[match].values
+        solutions = solution[match].values
+        for start in range(0, len(solution), chunk_size):
+            tasks.append((submissions[start:start + chunk_size], solutions[start:start + chunk_size],
+                          key_weight, value_weight, alpha, legacy))
+
+    processes = processes or os.cpu_count()
+    if processes == 1 or len(tasks) <= len(columns):
+        chunks = map(_score_chunk, tasks)
+    else:
+        with ProcessPoolExecutor(processes) as pool:
+            chunks = list(pool.map(_score_chunk, tasks))
+
+    return _average(chunks, columns, len(solution), chunk_size)
+
+
+def _average(chunks, columns, rows, chunk_size):
+    # Same accumulation order as score: row by row within a column, then column by column
+    chunks = iter(chunks)
+    total = 0.
+    for match in columns:
+        res = 0.
+        for _ in range(0, rows, chunk_size):
+            for row_score in next(chunks):
+                res += row_score
+        res = res / rows
+        total += res
+    return total / len(columns)
+
+
+class _Running:
+    # Welford's online mean and variance
+    __slots__ = ('n', 'mean', 'm2')
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.
+        self.m2 = 0.
+
+    def add(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    def variance(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else math.inf
+
+    def interval(self, z):
+        half = z * math.sqrt(self.variance() / self.n) if self.n else math.inf
+        return self.mean - half, self.mean + half
+
+
+def _field_values(obj):
+    # (field name, value) for every per-field score StreamingEvaluator tracks, None where the field is missing
+    obj = obj if isinstance(obj, dict) else {}
+    patient_info = obj.get('patient_info') if isinstance(obj.get('patient_info'), dict) else {}
+    vital_signs = obj.get('vital_signs') if isinstance(obj.get('vital_signs'), dict) else {}
+    yield 'age', patient_info.get('age')
+    yield 'gender', patient_info.get('gender')
+    yield 'visit_motivation', obj.get('visit_motivation')
+    yield 'symptoms', obj.get('symptoms')
+    for vital in VITALS:
+        yield vital, vital_signs.get(vital)
+
+
+class StreamingEvaluator:
+    '''
+    Scores results one at a time and keeps running means and confidence intervals, overall and per field.
+
+    Every `update` scores the prediction against the truth with `compare_json`. It also scores each field (age,
+    gender, visit_motivation, symptoms and every vital sign) on its own: compare_json of the two values when both
+    have the field, 0 when only one does, and nothing when neither does. Intervals use the normal approximation
+    at `confidence`.
+
+    `baseline` lets a run stop early once it is clearly worse than an earlier one. It can be the `scores` of a
+    finished run (a dict from key to score, or a list by position), which gives a paired comparison on the notes
+    both runs scored, or another StreamingEvaluator running alongside, compared by their means. `behind()` is
+    True once at least `min_samples` comparisons exist and the whole `stop_confidence` interval of the
+    difference lies below `-margin`. Checking after every note inflates the error rate, so `stop_confidence`
+    defaults to a stricter 0.99.
+
+    Example:
+    >>> evaluator = StreamingEvaluator()
+    >>> evaluator.update({"visit_motivation": "Asthma"}, '{"visit_motivation": "Anemia"}')
+    0.5
+    >>> evaluator.count, evaluator.mean, evaluator.fields()['visit_motivation']['mean']
+    (1, 0.5, 0.3333333333333333)
+    '''
+
+    def __init__(self, baseline=None, confidence=0.95, stop_confidence=0.99, min_samples=20, margin=0.,
+                 key_weight=0.25, value_weight=0.75, alpha=1.):
+        self.baseline = baseline
+        self.z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        self.stop_z = NormalDist().inv_cdf(0.5 + stop_confidence / 2)
+        self.min_samples = min_samples
+        self.margin = margin
+        self.weights = (key_weight, value_weight, alpha)
+        self.scores = {}
+        self.total = _Running()
+        self.by_field = {}
+        self.paired = _Running()
+
+    @property
+    def count(self):
+        return self.total.n
+
+    @property
+    def mean(self):
+        return self.total.mean
+
+    def update(self, truth, prediction, key=None):
+        '''Scores one result and returns its score. Strings are parsed as JSON; unparsable ones score 0.'''
+        truth = _parse_json(truth) if isinstance(truth, str) else truth
+        prediction = _parse_json(prediction) if isinstance(prediction, str) else prediction
+        similarity = float(compare_json(truth, prediction, *self.weights))
+        key = self.count if key is None else key
+        self.scores[key] = similarity
+        self.total.add(similarity)
+
+        for (name, expected), (_, actual) in zip(_field_values(truth), _field_values(prediction)):
+            if expected is None and actual is None:
+                continue
+            value = 0. if expected is None or actual is None else float(compare_json(expected, actual, *self.weights))
+            self.by_field.setdefault(name, _Running()).add(value)
+
+        if isinstance(self.baseline, dict) and key in self.baseline:
+            self.paired.add(similarity - self.baseline[key])
+        elif isinstance(self.baseline, (list, tuple)) and isinstance(key, int) and key < len(self.baseline):
+            self.paired.add(similarity - self.baseline[key])
+        return similarity
+
+    def interval(self, field=None):
+        '''Confidence interval of the overall mean score, or of one field's mean.'''
+        return (self.total if field is None else self.by_field[field]).interval(self.z)
+
+    def fields(self):
+        return {name: {'mean': stats.mean, 'interval': stats.interval(self.z), 'count': stats.n}
+                for name, stats in self.by_field.items()}
+
+    def difference(self):
+        '''Mean score minus the baseline's and its `stop_confidence` interval, with the number of comparisons.'''
+        if isinstance(self.baseline, StreamingEvaluator):
+            other = self.baseline.total
+            if self.total.n < 2 or other.n < 2:
+                return None
+            diff = self.total.mean - other.mean
+            half = self.stop_z * math.sqrt(self.total.variance() / self.total.n + other.variance() / other.n)
+            return diff, (diff - half, diff + half), min(self.total.n, other.n)
+        if self.paired.n < 2:
+            return None
+        return self.paired.mean, self.paired.interval(self.stop_z), self.paired.n
+
+    def behind(self):
+        '''True once this run is behind the baseline with `stop_confidence`, after at least `min_samples`.'''
+        difference = self.difference()
+        if difference is None:
+            return False
+        _, (_, high), n = difference
+        return n >= self.min_samples and high < -self.margin
+
+    def summary(self):
+        summary = {'count': self.count, 'mean': self.mean, 'interval': self.interval(), 'fields': self.fields()}
+        if self.baseline is not None:
+            summary['difference'] = self.difference()
+            summary['behind'] = self.behind()
+        return summary
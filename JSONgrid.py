@@ -0,0 +1,162 @@
+import csv
+import itertools
+import json
+import time
+from dataclasses import asdict
+from dataclasses import dataclass
+
+from JSONcreate import SYSTEM_PROMPT
+from JSONcreate import get_json_full
+from JSONcreate import get_json_segment
+from JSONcreate import iter_batch
+from JSONevalute import StreamingEvaluator
+from LLMAPIs import OllamaClient
+from LLMcache import ResponseCache
+
+MODES = {'full': get_json_full, 'segment': get_json_segment}
+
+# Output settings for full mode: free-form text, or Ollama's JSON mode. Segment mode always sends its schemas.
+FORMATS = {'free': None, 'json': 'json'}
+
+@dataclass(frozen=True)
+class Variant:
+    model: str
+    mode: str
+    prompt: str
+    format: str
+
+def expand_grid(models, modes=('full',), prompts=('default',), formats=('free',)):
+    """
+    Lists every combination of the grid axes as a Variant, in axis order.
+
+    Prompt and format variants only change full mode, so segment variants collapse to one per model, reported
+    with prompt "default" and format "schema".
+
+    >>> [(v.mode, v.prompt, v.format) for v in expand_grid(['gpt-oss'], ['full', 'segment'], ['default'], ['free', 'json'])]
+    [('full', 'default', 'free'), ('full', 'default', 'json'), ('segment', 'default', 'schema')]
+    """
+    variants = []
+    for model, mode, prompt, format in itertools.product(models, modes, prompts, formats):
+        if mode not in MODES:
+            raise ValueError(f'Unknown mode {mode!r}; expected one of {list(MODES)}')
+        if mode == 'segment':
+            prompt, format = 'default', 'schema'
+        elif format not in FORMATS:
+            raise ValueError(f'Unknown format {format!r}; expected one of {list(FORMATS)}')
+        variant = Variant(model, mode, prompt, format)
+        if variant not in variants:
+            variants.append(variant)
+    return variants
+
+def schedule(variants):
+    """Orders variants so all work for one model runs back to back, models in order of first appearance."""
+    order = {}
+    for variant in variants:
+        order.setdefault(variant.model, len(order))
+    return sorted(variants, key=lambda variant: order[variant.model])
+
+def load_pairs(path, limit=None, note_column='Note', json_column='json'):
+    """Reads (note, ground-truth object) pairs from a CSV like data/train.csv."""
+    pairs = []
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            pairs.append((row[note_column], json.loads(row[json_column])))
+            if limit is not None and len(pairs) >= limit:
+                break
+    return pairs
+
+def _kwargs(variant, prompts):
+    if variant.mode == 'segment':
+        return {}
+    kwargs = {'system_prompt': prompts.get(variant.prompt) or SYSTEM_PROMPT}
+    if FORMATS[variant.format] is not None:
+        kwargs['format'] = FORMATS[variant.format]
+    return kwargs
+
+def run_grid(pairs, variants, prompts=None, client=None, cache='.llmcache', concurrency=4, early_stop=False,
+             output=None, **kwargs):
+    """
+    Runs every variant over the same (note, truth) pairs and returns one comparable row per variant.
+
+    Variants are grouped by model: each model is loaded and pinned with warm_up before its first variant and
+    unloaded after its last, so weights are loaded once per model instead of on every switch. All variants
+    share one ResponseCache (`cache` is a directory, a ResponseCache, or False or None for no caching), so
+    identical requests are answered from disk. `prompts` maps prompt variant names to system prompts; "default"
+    and unknown names use SYSTEM_PROMPT.
+
+    Rows hold the variant, the StreamingEvaluator mean score with its 95% interval, per-field means, error
+    count, wall time and cache hits. With `early_stop` the first variant is the baseline and any later variant
+    stops as soon as it is statistically behind it (see StreamingEvaluator.behind). `output` writes the table
+    to a CSV file as well.
+
+    >>> variants = expand_grid(['gpt-oss', 'thewindmom/llama3-med42-8b'], ['full', 'segment'], formats=['free', 'json'])
+    >>> rows = run_grid(load_pairs('./data/train.csv', 100), variants, output='grid.csv')
+    """
+    prompts = prompts or {}
+    if cache is None:
+        cache = False
+    elif cache is not False and not isinstance(cache, ResponseCache):
+        cache = ResponseCache(cache)
+    own_client = client is None
+    client = OllamaClient() if own_client else client
+    notes = [note for note, _ in pairs]
+    truths = [truth for _, truth in pairs]
+
+    # The baseline has to finish first, so its model goes first and it leads its group
+    ordered = schedule(variants)
+    if early_stop and variants:
+        ordered = schedule([variants[0]] + [variant for variant in ordered if variant != variants[0]])
+
+    rows = []
+    baseline = None
+    try:
+        for model, group in itertools.groupby(ordered, key=lambda variant: variant.model):
+            start = time.perf_counter()
+            client.warm_up(model)
+            load_seconds = time.perf_counter() - start
+            for variant in group:
+                evaluator = StreamingEvaluator(baseline=baseline if early_stop else None)
+                before = cache.stats()['hits'] if cache else 0
+                errors = 0
+                stopped = False
+                start = time.perf_counter()
+                results = iter_batch(model, notes, concurrency, MODES[variant.mode], client=client, cache=cache,
+                                     **_kwargs(variant, prompts), **kwargs)
+                for result in results:
+                    errors += not result.ok
+                    evaluator.update(truths[result.index], result.json if result.ok else None, result.index)
+                    if evaluator.behind():
+                        stopped = True
+                        results.close()
+                        break
+                seconds = time.perf_counter() - start
+                if baseline is None:
+                    baseline = evaluator.scores
+                low, high = evaluator.interval() if evaluator.count else (None, None)
+                rows.append({
+                    **asdict(variant),
+                    'notes': evaluator.count,
+                    'score': evaluator.mean,
+                    'score_low': low,
+                    'score_high': high,
+                    **{f'field_{name}': stats['mean'] for name, stats in evaluator.fields().items()},
+                    'errors': errors,
+                    'stopped_early': stopped,
+                    'seconds': round(seconds, 3),
+                    'notes_per_second': round(evaluator.count / seconds, 3) if seconds else None,
+                    'cache_hits': (cache.stats()['hits'] - before) if cache else 0,
+                    'model_load_seconds': round(load_seconds, 3),
+                })
+                load_seconds = 0.
+            client.unload(model)
+    finally:
+        if own_client:
+            client.close()
+
+    if output:
+        columns = list(dict.fromkeys(key for row in rows for key in row))
+        with open(output, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, columns)
+            writer.writeheader()
+            writer.writerows(rows)
+    return rows
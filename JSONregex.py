@@ -0,0 +1,98 @@
+import re
+
+# Patterns follow the demographic pattern library in JSONcreate.response_grabber's system prompt
+
+# Age cues from most to least explicit; within a tier the last mention wins. The first EXPLICIT_TIERS tiers of
+# each list are explicit statements, the rest are weaker cues a model should be allowed to overrule
+AGE_TIERS = [
+    re.compile(r'\bage\s*[:=]\s*(\d{1,3})\b', re.I),
+    re.compile(r'\b(\d{1,3})\s*-?\s*(?:years?[- ]old|yrs?[- ]old|yr old|y/o|y\.o\.?|yo)(?![a-z])', re.I),
+    re.compile(r'\b(\d{1,3})\s*yrs?\b', re.I),
+]
+
+# Gender cues from most to least explicit; within a tier the last mention wins. Pronouns are not used: in
+# narrative text they often refer to relatives or staff. Titles must be capitalized and followed by a name, so
+# the verb "miss" does not count
+GENDER_TIERS = [
+    re.compile(r'\b(?:gender|sex)\s*[:=]?\s*(male|female|m|f)\b', re.I),
+    re.compile(r'\b\d{1,3}\s*-?\s*(?:years?[- ]old|yrs?|y/o|y\.o\.?|yo)\s*,?\s*(m|f|male|female)\b'
+               r'|\b(m|f)\s*,\s*\d{1,3}\s*-?\s*(?:years?[- ]old|yrs?|y/o|y\.o\.?|yo)\b', re.I),
+    re.compile(r'\b(male|female|man|woman)\b', re.I),
+    re.compile(r'\b(Mr|Mrs|Ms|Miss)\b\.?\s+[A-Z]'),
+]
+GENDER_TOKENS = {
+    'm': 'Male', 'male': 'Male', 'man': 'Male', 'mr': 'Male',
+    'f': 'Female', 'female': 'Female', 'woman': 'Female', 'mrs': 'Female', 'ms': 'Female', 'miss': 'Female',
+}
+EXPLICIT_TIERS = 2
+
+NUMBER = r'(\d{1,3}(?:\.\d+)?)'
+SEP = r'\s*(?:[:=]|of|was|is|at)?\s*'
+
+BLOOD_PRESSURE = re.compile(r'\b(?:BP|blood pressure)' + SEP + r'(\d{2,3})\s*/\s*(\d{2,3})(?:\s*mm\s*Hg)?', re.I)
+TEMPERATURE = re.compile(r'\b(?:temp(?:erature)?|T)' + SEP + NUMBER + r'\s*°?\s*([CF])\b', re.I)
+VITAL_PATTERNS = {
+    'heart_rate': (re.compile(r'\b(?:HR|heart rate|pulse(?: rate)?)' + SEP + NUMBER
+                              + r'\s*(?:bpm|beats(?:/min| per minute))?', re.I), 'bpm'),
+    'respiratory_rate': (re.compile(r'\b(?:RR|resp(?:iratory)?(?: rate)?)' + SEP + NUMBER
+                                    + r'\s*(?:breaths(?:/min| per minute)|/min)?', re.I), 'breaths/min'),
+    'oxygen_saturation': (re.compile(r'\b(?:SpO2|SaO2|O2 sat(?:uration)?|oxygen saturation|sats?)' + SEP + NUMBER
+                                     + r'\s*%', re.I), '%'),
+    'glucose_level': (re.compile(r'\b(?:(?:blood )?glucose(?: level)?|blood sugar|BG)' + SEP + NUMBER
+                                 + r'\s*mg/dL', re.I), 'mg/dL'),
+    'cholesterol_level': (re.compile(r'\b(?:(?:total )?cholesterol(?: level)?)' + SEP + NUMBER
+                                     + r'\s*mg/dL', re.I), 'mg/dL'),
+}
+
+def _number(text):
+    value = float(text)
+    return int(value) if value.is_integer() and '.' not in text else value
+
+def _last(pattern, notes):
+    match = None
+    for match in pattern.finditer(notes):
+        pass
+    return match
+
+def extract_patient_info(notes, explicit_only=False):
+    """
+    Returns {"age": ..., "gender": ...} with whichever keys the note states, last mention winning.
+
+    With `explicit_only` only the explicit tiers ("Age: 56", "56-year-old", "Sex: F", "56 yo M") are used.
+
+    >>> extract_patient_info('56-year-old male, diagnosed with asthma at age 12. His wife says she noticed it.')
+    {'age': 56, 'gender': 'Male'}
+    >>> extract_patient_info('45 yo, he did not miss a dose', explicit_only=True)
+    {'age': 45}
+    """
+    patient_info = {}
+    for tier in AGE_TIERS[:EXPLICIT_TIERS] if explicit_only else AGE_TIERS:
+        match = _last(tier, notes)
+        if match:
+            patient_info['age'] = int(match.group(1))
+            break
+    for tier in GENDER_TIERS[:EXPLICIT_TIERS] if explicit_only else GENDER_TIERS:
+        match = _last(tier, notes)
+        if match:
+            token = next(group for group in match.groups() if group)
+            patient_info['gender'] = GENDER_TOKENS[token.lower()]
+            break
+    return patient_info
+
+def extract_vital_signs(notes):
+    """Returns the atomic vital signs found in the note, each with value and unit, last reading winning."""
+    vital_signs = {}
+    match = _last(TEMPERATURE, notes)
+    if match:
+        vital_signs['temperature'] = {'value': _number(match.group(1)), 'unit': '°' + match.group(2).upper()}
+    match = _last(BLOOD_PRESSURE, notes)
+    if match:
+        vital_signs['blood_pressure'] = {
+            'systolic': {'value': int(match.group(1)), 'unit': 'mmHg'},
+            'diastolic': {'value': int(match.group(2)), 'unit': 'mmHg'},
+        }
+    for key, (pattern, unit) in VITAL_PATTERNS.items():
+        match = _last(pattern, notes)
+        if match:
+            vital_signs[key] = {'value': _number(match.group(1)), 'unit': unit}
+    return vital_signs
@@ -0,0 +1,150 @@
+import json
+import re
+
+FENCE = re.compile(r'```(?:json|JSON)?\s*(.*?)(?:```|$)', re.S)
+TRAILING_COMMA = re.compile(r',(\s*[}\]])')
+PYTHON_LITERALS = {'None': 'null', 'True': 'true', 'False': 'false', 'NULL': 'null', 'Null': 'null'}
+LITERAL = re.compile(r'\b(' + '|'.join(PYTHON_LITERALS) + r')\b')
+PLACEHOLDERS = (None, '#', '', 'null', 'None', 'NULL', 'N/A')
+
+def _split_strings(text):
+    """Splits text into (is_string, segment) pieces so fixes are only applied outside string literals."""
+    pieces = []
+    start = 0
+    in_string = False
+    escaped = False
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                pieces.append((True, text[start:i + 1]))
+                start = i + 1
+                in_string = False
+        elif char == '"':
+            pieces.append((False, text[start:i]))
+            start = i
+            in_string = True
+    pieces.append((in_string, text[start:]))
+    return pieces
+
+def _extract_object(text):
+    """
+    Returns (text from the first '{' to its matching '}', False), or (text to the end, True) when the object is
+    truncated.
+    """
+    match = FENCE.search(text)
+    if match:
+        text = match.group(1)
+    start = text.find('{')
+    if start == -1:
+        raise json.JSONDecodeError('No JSON object found', text, 0)
+    depth = 0
+    pos = start
+    for is_string, segment in _split_strings(text[start:]):
+        if not is_string:
+            for offset, char in enumerate(segment):
+                if char in '{[':
+                    depth += 1
+                elif char in '}]':
+                    depth -= 1
+                    if depth == 0:
+                        return text[start:pos + offset + 1], False
+        pos += len(segment)
+    return text[start:], True
+
+def _fix_syntax(text):
+    pieces = []
+    for is_string, segment in _split_strings(text):
+        if not is_string:
+            segment = LITERAL.sub(lambda m: PYTHON_LITERALS[m.group(1)], segment)
+        pieces.append((is_string, segment))
+
+    # A string cut off mid-value is half-written, so it is never closed; _truncations drops that member instead
+    if pieces[-1][0]:
+        raise json.JSONDecodeError('Unterminated string', text, len(text))
+
+    # Close any brackets left open by a truncated response
+
+    fixed = ''.join(segment for _, segment in pieces)
+    stack = []
+    for is_string, segment in pieces:
+        if is_string:
+            continue
+        for char in segment:
+            if char in '{[':
+                stack.append('}' if char == '{' else ']')
+            elif char in '}]' and stack:
+                stack.pop()
+    fixed = fixed.rstrip().rstrip(',:')
+    fixed += ''.join(reversed(stack))
+    return ''.join(TRAILING_COMMA.sub(r'\1', segment) if not is_string else segment
+                   for is_string, segment in _split_strings(fixed))
+
+def _truncations(text, truncated):
+    """
+    Yields the candidates to parse: a closed object as it is, a truncated one cut back to each earlier comma,
+    dropping a half-written trailing member.
+
+    Cutting back is only for truncated text: in a closed object that still fails to parse (a missing comma, say)
+    it would silently drop complete members, so that is left to the fix-JSON request. A truncated text is only
+    tried whole when it stops right after a complete value, since a trailing number or literal may itself be cut
+    short ("5" of "56").
+    """
+    if not truncated:
+        yield text
+        return
+    end = text.rstrip()[-1:]
+    if end in ('}', ']', '"', ','):
+        yield text
+    cut = len(text)
+    while True:
+        cut = text.rfind(',', 0, cut)
+        if cut == -1:
+            return
+        yield text[:cut]
+
+def normalize_placeholders(data):
+    """Drops keys whose values are None/"null"/"#"-style placeholders, and containers left empty by that."""
+    if isinstance(data, dict):
+        cleaned = {}
+        for key, value in data.items():
+            value = normalize_placeholders(value)
+            if value in PLACEHOLDERS or value == {} or value == []:
+                continue
+            cleaned[key] = value
+        return cleaned
+    if isinstance(data, list):
+        return [item for item in map(normalize_placeholders, data) if item not in PLACEHOLDERS]
+    return data
+
+def repair_json(text):
+    """
+    Repairs common defects in model JSON output without another model call.
+
+    Strips code fences and surrounding prose, converts Python literals (None/True/False), removes trailing
+    commas, drops a half-written last member of a truncated response and closes its brackets, and drops
+    placeholder values. Raises json.JSONDecodeError when the text still does not parse.
+
+    >>> repair_json('Here you go: ```json {"age": 56, "gender": None, "symptoms": ["cough",], ```')
+    {'age': 56, 'symptoms': ['cough']}
+    >>> repair_json('{"visit_motivation": "Asthma", "symptoms": ["cough", "fev')
+    {'visit_motivation': 'Asthma', 'symptoms': ['cough']}
+    >>> repair_json('{"visit_motivation": "Asthma", "symptoms": ["cough" "fever"]}')
+    Traceback (most recent call last):
+    ...
+    json.decoder.JSONDecodeError: Expecting ',' delimiter: line 1 column 53 (char 52)
+    """
+    body, truncated = _extract_object(text)
+    error = None
+    for candidate in _truncations(body, truncated):
+        try:
+            data = json.loads(_fix_syntax(candidate))
+        except json.JSONDecodeError as e:
+            error = error or e
+            continue
+        if isinstance(data, dict):
+            return normalize_placeholders(data)
+    raise error or json.JSONDecodeError('Not a JSON object', text, 0)
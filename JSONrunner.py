@@ -0,0 +1,163 @@
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+
+from JSONcreate import get_json_full
+from JSONcreate import iter_batch
+
+# Notes can be far longer than the csv module's default 128 KiB field limit
+csv.field_size_limit(min(sys.maxsize, 2 ** 31 - 1))
+
+def read_notes(path, id_column='ID', note_column='Note'):
+    """
+    Streams (id, note) pairs from a CSV file one row at a time.
+
+    Ids are returned as strings. When the file has no `id_column` the zero-based row number is used instead, so
+    the same file always yields the same ids.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        has_ids = id_column in (reader.fieldnames or [])
+        for row_number, row in enumerate(reader):
+            yield (row[id_column] if has_ids else str(row_number)), row[note_column]
+
+class JSONLWriter:
+    """
+    Appends one JSON record per line and flushes after each one, so a crash loses at most the line being written.
+
+    A partial last line left by a crash is cut off when the file is reopened.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._drop_partial_line()
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def _drop_partial_line(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            if data and not data.endswith(b'\n'):
+                f.truncate(data.rfind(b'\n') + 1)
+
+    def records(self):
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+
+class ParquetWriter:
+    """
+    Writes records as a directory of Parquet part files, `rows_per_file` records at a time.
+
+    Parquet files cannot be appended to, so each part is written to a temporary name and renamed when complete.
+    A crash loses only the records buffered since the last part, at most `rows_per_file` - 1. Needs pyarrow.
+    """
+
+    def __init__(self, path, rows_per_file=50):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as error:
+            raise ImportError('Parquet output needs pyarrow: pip install pyarrow') from error
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        self.path = path
+        self.rows_per_file = rows_per_file
+        self.buffer = []
+        os.makedirs(path, exist_ok=True)
+        self.parts = len([name for name in os.listdir(path) if name.endswith('.parquet')])
+
+    def records(self):
+        for name in sorted(os.listdir(self.path)):
+            if name.endswith('.parquet'):
+                yield from self.pq.read_table(os.path.join(self.path, name)).to_pylist()
+
+    def write(self, record):
+        self.buffer.append(record)
+        if len(self.buffer) >= self.rows_per_file:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        part = os.path.join(self.path, f'part-{self.parts:05d}.parquet')
+        self.pq.write_table(self.pa.Table.from_pylist(self.buffer), part + '.tmp')
+        os.replace(part + '.tmp', part)
+        self.parts += 1
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+
+def open_output(path, **kwargs):
+    """Returns a ParquetWriter for paths ending in .parquet, otherwise a JSONLWriter; `kwargs` go to ParquetWriter."""
+    if path.endswith('.parquet'):
+        return ParquetWriter(path, **kwargs)
+    return JSONLWriter(path)
+
+def completed_ids(output, retry_failed=True):
+    """Ids already in `output`; with `retry_failed` ids whose only records are errors are left out."""
+    done = set()
+    for record in output.records():
+        if record['error'] is None or not retry_failed:
+            done.add(str(record['id']))
+    return done
+
+def run_csv(model, csv_path, output_path, extract=get_json_full, concurrency=4, pack=1, token_budget=None,
+            id_column='ID', note_column='Note', retry_failed=True, rows_per_file=50, **kwargs):
+    """
+    Extracts every note in `csv_path` and appends one record per note to `output_path` as it finishes.
+
+    Records hold the note id, model, JSON string (or error message) and seconds taken. Ids already in the output
+    are skipped, so rerunning after a crash or preemption only pays for notes that were never finished. Failed
+    notes are retried on the next run unless `retry_failed=False`. Notes are read and dispatched through
+    iter_batch's bounded window, so memory does not grow with the size of the input. Parquet output is written
+    `rows_per_file` records per part file; a smaller value loses fewer results on a crash but makes more files.
+
+    Returns counts of notes written, failed and skipped.
+
+    >>> run_csv('gpt-oss', './data/train.csv', 'results.jsonl', concurrency=4)
+    {'written': 100, 'failed': 0, 'skipped': 0}
+    """
+    output = open_output(output_path, rows_per_file=rows_per_file)
+    done = completed_ids(output, retry_failed)
+    counts = {'written': 0, 'failed': 0, 'skipped': 0}
+    ids = deque()
+
+    def todo():
+        for note_id, note in read_notes(csv_path, id_column, note_column):
+            if note_id in done:
+                counts['skipped'] += 1
+                continue
+            ids.append(note_id)
+            yield note
+
+    try:
+        for result in iter_batch(model, todo(), concurrency, extract, pack, token_budget, **kwargs):
+            output.write({
+                'id': ids.popleft(),
+                'model': model,
+                'json': result.json,
+                'error': None if result.ok else f'{type(result.error).__name__}: {result.error}',
+                'seconds': round(result.seconds, 4),
+                'timestamp': time.time(),
+            })
+            counts['written'] += 1
+            counts['failed'] += not result.ok
+    finally:
+        output.close()
+    return counts
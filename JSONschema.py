@@ -0,0 +1,61 @@
+"""
+The fixed output schema every extraction follows, as plain Python constants.
+
+This module has no dependencies so that extraction, scoring and storage code can share it cheaply.
+"""
+
+TOP_LEVEL_KEYS = ["patient_info", "visit_motivation", "symptoms", "vital_signs"]
+
+PATIENT_INFO_KEYS = ["age", "gender"]
+
+GENDERS = ["Female", "Male"]
+
+VISIT_MOTIVATIONS = [
+    "Allergies", "Anemia", "Anxiety Disorders", "Asthma", "COVID-19",
+    "Chronic Obstructive Pulmonary Disease (COPD)", "Common Cold", "Depression",
+    "Diabetes (Type 2)", "Ear Infection (Otitis Media)", "Eczema (Atopic Dermatitis)",
+    "Gastroesophageal Reflux Disease (GERD)", "Heart Disease (Coronary Artery Disease)",
+    "Hypertension (High Blood Pressure)", "Influenza (Flu)", "Pneumonia",
+    "Sinusitis", "Strep Throat", "Tuberculosis (TB)", "Urinary Tract Infection (UTI)",
+]
+
+SYMPTOMS = [
+    "abdominal_pain", "anxiety", "blurred_vision", "chest_pain", "cough", "diarrhea",
+    "difficulty_breathing", "difficulty_concentrating", "dizziness", "dry_skin",
+    "ear_pain", "facial_pain", "fatigue", "fever", "frequent_urination", "headache",
+    "heartburn", "increased_thirst", "itchy_eyes", "joint_pain", "loss_of_taste_smell",
+    "nausea", "night_sweats", "painful_urination", "pale_skin", "rash", "restlessness",
+    "runny_nose", "sadness", "sneezing", "sore_throat", "swollen_lymph_nodes",
+    "vomiting", "weight_loss", "wheezing",
+]
+
+# Allowed units per single-value vital; blood_pressure holds systolic and diastolic readings in mmHg
+VITAL_UNITS = {
+    "temperature": ["°C", "°F"],
+    "heart_rate": ["bpm"],
+    "respiratory_rate": ["breaths/min"],
+    "oxygen_saturation": ["%"],
+    "glucose_level": ["mg/dL"],
+    "cholesterol_level": ["mg/dL"],
+}
+BLOOD_PRESSURE_PARTS = ["systolic", "diastolic"]
+BLOOD_PRESSURE_UNITS = ["mmHg"]
+
+VITALS = ["temperature", "blood_pressure", "heart_rate", "respiratory_rate",
+          "oxygen_saturation", "glucose_level", "cholesterol_level"]
+
+UNITS = ["°C", "°F", "mmHg", "bpm", "breaths/min", "%", "mg/dL"]
+
+# Physiologically plausible bounds, inclusive; values outside them are almost always extraction errors
+AGE_RANGE = (0, 120)
+VITAL_RANGES = {
+    "°C": (30, 45),
+    "°F": (86, 113),
+    "systolic": (50, 260),
+    "diastolic": (20, 160),
+    "heart_rate": (20, 250),
+    "respiratory_rate": (4, 70),
+    "oxygen_saturation": (50, 100),
+    "glucose_level": (20, 1000),
+    "cholesterol_level": (50, 600),
+}
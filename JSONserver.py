@@ -0,0 +1,267 @@
+import asyncio
+import json
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from dataclasses import field
+
+from JSONcreate import _extract_pack
+from JSONcreate import get_json_full
+from JSONcreate import get_json_segment
+from LLMAPIs import RequestCancelled
+from LLMtrace import MemorySink
+from LLMtrace import add_sink
+from LLMtrace import remove_sink
+
+MODES = {'full': get_json_full, 'segment': get_json_segment}
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large',
+           429: 'Too Many Requests', 500: 'Internal Server Error', 503: 'Service Unavailable',
+           504: 'Gateway Timeout'}
+
+@dataclass
+class _Job:
+    note: str
+    mode: str
+    future: asyncio.Future
+    cancel: threading.Event = field(default_factory=threading.Event)
+    # Jobs sharing one packed request, and the event that cancels it once every one of them has given up
+    batch: tuple | None = None
+
+class ExtractionServer:
+    """
+    Asynchronous HTTP front end for get_json_full and get_json_segment.
+
+    POST /extract takes {"note": ..., "mode": "full" | "segment", "timeout": seconds} and answers with
+    {"json": ..., "seconds": ...}. Requests wait in a queue of `queue_size`; when it is full the server answers
+    429 with a Retry-After header instead of queueing more. `workers` batchers take requests off the queue,
+    wait `batch_window` seconds for company, and send up to `max_batch` full-mode notes as one packed request
+    (see get_json_packed); notes the pack does not answer are re-run alone. Segment-mode notes in a batch run
+    side by side.
+
+    Each request has a deadline, `timeout` from the body or `default_timeout`. When it passes the client gets
+    504 and the request's cancel event is set. Model output is streamed, so generation stops at the next token;
+    a packed request is stopped once every note in it has timed out.
+
+    GET /health reports queue depth and answers 503 while the queue is full. GET /metrics returns the server
+    counters and the per-call LLMtrace totals in the Prometheus text format.
+
+    >>> server = ExtractionServer('gpt-oss', client=OllamaClient(keep_alive='30m'))
+    >>> server.run('127.0.0.1', 8080)
+    """
+
+    def __init__(self, model, queue_size=64, workers=2, max_batch=4, batch_window=0.01, default_timeout=120.,
+                 max_body=1024 * 1024, **kwargs):
+        self.model = model
+        self.queue_size = queue_size
+        self.workers = workers
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.default_timeout = default_timeout
+        self.max_body = max_body
+        # Passed on to the extraction functions, e.g. client= or cache=
+        self.kwargs = {'stream': True, **kwargs}
+        self.counters = Counter()
+        self.in_flight = 0
+        self.sink = None
+        self.queue = None
+        self.server = None
+        self.tasks = []
+        self.pool = None
+
+    async def start(self, host='127.0.0.1', port=8080):
+        self.sink = add_sink(MemorySink())
+        self.queue = asyncio.Queue(self.queue_size)
+        self.pool = ThreadPoolExecutor(max_workers=self.workers * self.max_batch)
+        self.server = await asyncio.start_server(self._connection, host, port)
+        self.tasks = [asyncio.create_task(self._batcher()) for _ in range(self.workers)]
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        remove_sink(self.sink)
+
+    def run(self, host='127.0.0.1', port=8080):
+        async def serve():
+            await self.start(host, port)
+            async with self.server:
+                await self.server.serve_forever()
+        asyncio.run(serve())
+
+    async def _batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            jobs = [await self.queue.get()]
+            if self.max_batch > 1 and self.queue.empty():
+                await asyncio.sleep(self.batch_window)
+            while len(jobs) < self.max_batch and not self.queue.empty():
+                jobs.append(self.queue.get_nowait())
+            # Requests that timed out while queued have already been answered
+            jobs = [job for job in jobs if not job.cancel.is_set()]
+            if not jobs:
+                continue
+            self.counters['batches'] += 1
+            self.counters['batched_notes'] += len(jobs)
+            self.in_flight += len(jobs)
+            try:
+                packed = [job for job in jobs if job.mode == 'full']
+                groups = [[job] for job in jobs if job.mode != 'full']
+                groups += [packed] if len(packed) > 1 else [[job] for job in packed]
+                await asyncio.gather(*(self._run_group(loop, group) for group in groups))
+            finally:
+                self.in_flight -= len(jobs)
+
+    async def _run_group(self, loop, jobs):
+        work = self._extract_packed if len(jobs) > 1 else self._extract_alone
+        for job, result in zip(jobs, await loop.run_in_executor(self.pool, work, jobs)):
+            # Nobody is waiting on a request that already got its 504
+            if job.cancel.is_set():
+                continue
+            if isinstance(result, Exception):
+                job.future.set_exception(result)
+            else:
+                job.future.set_result(result)
+
+    def _extract_alone(self, jobs):
+        try:
+            return [self._extract(jobs[0])]
+        except Exception as error:
+            return [error]
+
+    def _extract(self, job):
+        return MODES[job.mode](self.model, job.note, cancel=job.cancel, **self.kwargs)
+
+    def _extract_packed(self, jobs):
+        cancel = threading.Event()
+        for job in jobs:
+            job.batch = (jobs, cancel)
+        try:
+            extracted = _extract_pack(self.model, {str(i): job.note for i, job in enumerate(jobs)}, cancel=cancel,
+                                      **self.kwargs)
+        except Exception:
+            extracted = {}
+        results = []
+        for i, job in enumerate(jobs):
+            if str(i) in extracted:
+                results.append(extracted[str(i)])
+                continue
+            results += self._extract_alone([job])
+        return results
+
+    async def _extract_route(self, body):
+        try:
+            request = json.loads(body)
+            note = request['note']
+            mode = request.get('mode', 'full')
+            timeout = float(request.get('timeout', self.default_timeout))
+            if not isinstance(note, str) or mode not in MODES or timeout <= 0:
+                raise ValueError
+        except (ValueError, KeyError, TypeError):
+            return 400, {'error': 'expected {"note": str, "mode": "full" | "segment", "timeout": seconds > 0}'}, {}
+
+        job = _Job(note, mode, asyncio.get_running_loop().create_future())
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.counters['rejected'] += 1
+            return 429, {'error': 'queue full'}, {'Retry-After': '1'}
+
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(asyncio.shield(job.future), timeout)
+        except (asyncio.TimeoutError, RequestCancelled):
+            job.cancel.set()
+            if job.batch is not None and all(other.cancel.is_set() for other in job.batch[0]):
+                job.batch[1].set()
+            self.counters['deadline_exceeded'] += 1
+            return 504, {'error': f'no result within {timeout} seconds'}, {}
+        except Exception as error:
+            self.counters['failed'] += 1
+            return 500, {'error': f'{type(error).__name__}: {error}'}, {}
+        self.counters['completed'] += 1
+        return 200, {'json': json.loads(result), 'seconds': round(time.perf_counter() - start, 4)}, {}
+
+    def _health(self):
+        saturated = self.queue.full()
+        return 503 if saturated else 200, {'status': 'saturated' if saturated else 'ok', 'queued': self.queue.qsize(),
+                                           'queue_size': self.queue_size, 'in_flight': self.in_flight}, {}
+
+    def _metrics(self, prefix='mednotes'):
+        lines = []
+        for name in ('requests', 'completed', 'failed', 'rejected', 'deadline_exceeded', 'batches', 'batched_notes'):
+            lines.append(f'# TYPE {prefix}_server_{name}_total counter')
+            lines.append(f'{prefix}_server_{name}_total {self.counters[name]}')
+        for name, value in (('queue_depth', self.queue.qsize()), ('in_flight', self.in_flight)):
+            lines.append(f'# TYPE {prefix}_server_{name} gauge')
+            lines.append(f'{prefix}_server_{name} {value}')
+        return 200, '\n'.join(lines) + '\n' + self.sink.prometheus(prefix), {}
+
+    async def _route(self, method, path, body):
+        path = path.split('?', 1)[0]
+        if path == '/extract':
+            if method != 'POST':
+                return 405, {'error': 'use POST'}, {'Allow': 'POST'}
+            self.counters['requests'] += 1
+            return await self._extract_route(body)
+        if path in ('/health', '/metrics'):
+            if method != 'GET':
+                return 405, {'error': 'use GET'}, {'Allow': 'GET'}
+            return self._health() if path == '/health' else self._metrics()
+        return 404, {'error': f'no route {path}'}, {}
+
+    async def _connection(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    method, path, version = line.decode('latin-1').split()
+                except ValueError:
+                    await self._respond(writer, 400, {'error': 'malformed request line'}, {}, False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get('content-length') or 0)
+                    if length < 0:
+                        raise ValueError
+                except ValueError:
+                    await self._respond(writer, 400, {'error': 'malformed Content-Length'}, {}, False)
+                    break
+                if length > self.max_body:
+                    await self._respond(writer, 413, {'error': f'body over {self.max_body} bytes'}, {}, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                status, payload, extra = await self._route(method, path, body)
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                await self._respond(writer, status, payload, extra, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, extra, keep_alive):
+        if isinstance(payload, str):
+            body, content_type = payload.encode('utf-8'), 'text/plain; version=0.0.4'
+        else:
+            body, content_type = json.dumps(payload, ensure_ascii=False).encode('utf-8'), 'application/json'
+        headers = {'Content-Type': content_type, 'Content-Length': str(len(body)),
+                   'Connection': 'keep-alive' if keep_alive else 'close', **extra}
+        head = f'HTTP/1.1 {status} {REASONS[status]}\r\n' + ''.join(f'{k}: {v}\r\n' for k, v in headers.items())
+        writer.write(head.encode('latin-1') + b'\r\n' + body)
+        await writer.drain()
@@ -0,0 +1,361 @@
+import json
+import os
+
+import numpy as np
+
+from JSONevalute import _field_values
+from JSONevalute import _parse_json
+from JSONevalute import compare_json
+from JSONschema import SYMPTOMS
+from JSONschema import VITALS
+from JSONvector import ABSENT
+from JSONvector import CHILDREN
+from JSONvector import LEAF
+from JSONvector import LEAF_PATHS
+from JSONvector import NULL
+from JSONvector import NUMBER
+from JSONvector import PATHS
+from JSONvector import STRING
+from JSONvector import SchemaColumns
+from JSONvector import compare_json_vectorized
+
+VERSION = 1
+
+# Leaves by the one kind they may hold besides null; a row with anything else keeps its JSON text instead
+NUMERIC_PATHS = [path for path in LEAF_PATHS if path[-1] in ('age', 'value')]
+STRING_PATHS = [path for path in LEAF_PATHS if path[-1] in ('gender', 'visit_motivation', 'unit')]
+SYMPTOMS_PATH = ('symptoms',)
+
+# The per-field scores StreamingEvaluator keeps, and the schema path each one compares
+FIELDS = {'age': ('patient_info', 'age'), 'gender': ('patient_info', 'gender'),
+          'visit_motivation': ('visit_motivation',), 'symptoms': SYMPTOMS_PATH,
+          **{vital: ('vital_signs', vital) for vital in VITALS}}
+
+# Layout codes for rows without columns: -1 keeps only the raw text, -2 had no output at all
+RAW, MISSING = -1, -2
+
+_PATH_INDEX = {path: i for i, (path, _) in enumerate(PATHS)}
+_LEAF_INDEX = {path: i for i, path in enumerate(LEAF_PATHS)}
+_NUMERIC_INDEX = {path: i for i, path in enumerate(NUMERIC_PATHS)}
+_STRING_INDEX = {path: i for i, path in enumerate(STRING_PATHS)}
+_SYMPTOM_INDEX = {symptom: i for i, symptom in enumerate(SYMPTOMS)}
+
+class _Unfit(Exception):
+    pass
+
+def _dumps(obj):
+    return json.dumps(obj, separators=(',', ':'))
+
+def _walk(obj, children, layout, is_int, orders):
+    # Records key order as path indices and the int/float and symptom order details the columns drop
+    for key, value in obj.items():
+        path, child = children[key]
+        layout.append(_PATH_INDEX[path])
+        if child is not LEAF:
+            _walk(value, CHILDREN[path], layout, is_int, orders)
+        elif value is None:
+            continue
+        elif isinstance(value, bool):
+            raise _Unfit
+        elif path in _NUMERIC_INDEX and isinstance(value, (int, float)):
+            is_int.append((_NUMERIC_INDEX[path], isinstance(value, int)))
+        elif path == SYMPTOMS_PATH and isinstance(value, list):
+            order = tuple(_SYMPTOM_INDEX[symptom] for symptom in value)
+            if len(set(order)) != len(order):
+                raise _Unfit
+            if list(order) != sorted(order):
+                orders[path] = order
+        elif not (path in _STRING_INDEX and isinstance(value, str)):
+            raise _Unfit
+
+def _save(path, name, array):
+    # np.save appends .npy to names without it, so the temporary name has to keep the suffix
+    temporary = os.path.join(path, f'.{name}.tmp.npy')
+    np.save(temporary, array)
+    os.replace(temporary, os.path.join(path, f'{name}.npy'))
+
+def write_store(path, outputs, truths=None, seconds=None, ids=None, key_weight=0.25, value_weight=0.75, alpha=1.):
+    """
+    Writes extraction outputs to a columnar store directory and returns it opened as a ResultStore.
+
+    `outputs` are the JSON strings the extractors return (objects and None for failed notes work too). With
+    `truths` (objects, JSON strings or another ResultStore) the compare_json score and the per-field scores of
+    every row are stored as well. `seconds` are call timings, e.g. BatchResult.seconds, and `ids` note ids.
+
+    Each column is a separate .npy file plus meta.json, which is written last, so a store is complete once
+    meta.json exists. Rewriting a directory replaces the store.
+
+    >>> results = extract_batch('gpt-oss', data['Note'])
+    >>> store = write_store('results.store', [r.json for r in results], data['json'], [r.seconds for r in results])
+    """
+    outputs = list(outputs)
+    n = len(outputs)
+    objects = [_parse_json(output) if isinstance(output, str) else output for output in outputs]
+    vocabulary = {}
+    columns = SchemaColumns(objects, vocabulary)
+
+    layouts, orders = {}, {}
+    layout_codes = np.full(n, MISSING, np.int32)
+    order_codes = np.full(n, -1, np.int32)
+    is_int = np.zeros((n, len(NUMERIC_PATHS)), bool)
+    raw = []
+    offsets = np.zeros(n + 1, np.int64)
+    for row, (output, obj) in enumerate(zip(outputs, objects)):
+        text = b''
+        if output is not None:
+            layout_codes[row] = RAW
+            if columns.ok[row]:
+                layout, ints, order = [], [], {}
+                try:
+                    _walk(obj, CHILDREN[()], layout, ints, order)
+                except _Unfit:
+                    columns.ok[row] = False
+                else:
+                    layout_codes[row] = layouts.setdefault(tuple(layout), len(layouts))
+                    for column, value in ints:
+                        is_int[row, column] = value
+                    if order:
+                        order_codes[row] = orders.setdefault(order[SYMPTOMS_PATH], len(orders))
+            # Text the columns cannot reproduce byte for byte is kept as it is
+            if not columns.ok[row] or (isinstance(output, str) and output != _dumps(obj)):
+                text = (output if isinstance(output, str) else _dumps(output)).encode('utf-8')
+        raw.append(text)
+        offsets[row + 1] = offsets[row] + len(text)
+
+    fits = layout_codes >= 0
+    kind = np.stack([np.where(fits, columns.kind[path], ABSENT) for path in LEAF_PATHS], axis=1).astype(np.int8)
+    number = np.stack([np.where(fits, columns.number[path], 0.) for path in NUMERIC_PATHS], axis=1)
+    string = np.stack([np.where(fits & (columns.kind[path] == STRING), columns.string[path], -1)
+                       for path in STRING_PATHS], axis=1).astype(np.int32)
+    symptoms = np.where(fits, columns.items[SYMPTOMS_PATH], np.uint64(0)).astype(np.uint64)
+
+    os.makedirs(path, exist_ok=True)
+    # Without meta.json the directory is not a store, and optional columns of an older store must not linger
+    for name in ('meta.json', 'ids.npy', 'score.npy', 'field_scores.npy'):
+        if os.path.exists(os.path.join(path, name)):
+            os.remove(os.path.join(path, name))
+    arrays = {'layout': layout_codes, 'kind': kind, 'number': number, 'is_int': is_int, 'string': string,
+              'symptoms': symptoms, 'symptom_order': order_codes, 'raw_offsets': offsets,
+              'seconds': np.full(n, np.nan) if seconds is None else np.asarray(seconds, float)}
+    if ids is not None:
+        arrays['ids'] = np.array([str(note_id).encode('utf-8') for note_id in ids], dtype=bytes)
+    for name, array in arrays.items():
+        _save(path, name, array)
+    with open(os.path.join(path, 'raw.bin'), 'wb') as f:
+        f.write(b''.join(raw))
+
+    meta = {'version': VERSION, 'rows': n, 'vocabulary': list(vocabulary),
+            'layouts': [list(layout) for layout in layouts], 'symptom_orders': [list(order) for order in orders],
+            'fields': list(FIELDS), 'weights': [key_weight, value_weight, alpha], 'scored': truths is not None,
+            'ids': ids is not None}
+    store = ResultStore(path, meta)
+    if truths is not None:
+        scores, fields = store.rescore(truths, key_weight, value_weight, alpha)
+        _save(path, 'score', scores)
+        _save(path, 'field_scores', np.stack([fields[name] for name in FIELDS], axis=1))
+    with open(os.path.join(path, 'meta.tmp.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(os.path.join(path, 'meta.tmp.json'), os.path.join(path, 'meta.json'))
+    return ResultStore(path)
+
+class ResultStore:
+    """
+    Extraction outputs, scores and timings as typed, memory-mapped columns that follow the fixed schema.
+
+    Columns are opened with np.load(mmap_mode='r'), so opening a store reads only meta.json and pages are
+    loaded as they are touched. Per row the store holds:
+
+    - `number`: float64 for age and every vital value (NUMERIC_PATHS order), with `is_int` to keep 98 and 98.0 apart
+    - `string`: dictionary codes into `vocabulary` for gender, visit_motivation and the units (STRING_PATHS
+      order), -1 where the field is not a string
+    - `symptoms`: a bitset over JSONschema.SYMPTOMS
+    - `kind`: the JSONvector kind code of every leaf (LEAF_PATHS order), which tells absent, null and set apart
+    - `layout`: the row's key order as a code into the layouts in meta.json, RAW (-1) for rows that do not fit
+      the schema and MISSING (-2) for failed notes
+    - `seconds`, and with truths `score` and `field_scores` (one column per FIELDS name, NaN where neither side
+      has the field)
+
+    Rows that do not fit the schema, and text that is not in json.dumps(separators=(',', ':')) form, keep their
+    original text in raw.bin, so `json(row)` always gives back exactly what was written.
+
+    >>> store = ResultStore('results.store')
+    >>> store.numbers('patient_info.age').mean(), store.has_symptom('fever').mean()
+    >>> scores, fields = store.rescore(ResultStore('truth.store'))
+    """
+
+    def __init__(self, path, meta=None):
+        self.path = path
+        if meta is None:
+            with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+                meta = json.load(f)
+        if meta['version'] != VERSION:
+            raise ValueError(f'Unsupported store version {meta["version"]}')
+        self.meta = meta
+        self.vocabulary = meta['vocabulary']
+        for name in ('layout', 'kind', 'number', 'is_int', 'string', 'symptoms', 'symptom_order', 'raw_offsets',
+                     'seconds', 'ids', 'score', 'field_scores'):
+            file = os.path.join(path, f'{name}.npy')
+            setattr(self, name, np.load(file, mmap_mode='r') if os.path.exists(file) else None)
+        raw_path = os.path.join(path, 'raw.bin')
+        self.raw = np.memmap(raw_path, np.uint8, 'r') if os.path.getsize(raw_path) else np.zeros(0, np.uint8)
+        self._steps = [self._plan(layout) for layout in meta['layouts']]
+        self._orders = [[SYMPTOMS[i] for i in order] for order in meta['symptom_orders']]
+
+    @staticmethod
+    def _plan(layout):
+        # (parent path, key, path, leaf column) per key in output order, so decoding only fills values in
+        steps = []
+        for index in layout:
+            path, child = PATHS[index]
+            steps.append((path[:-1], path[-1], path, _LEAF_INDEX[path] if child is LEAF else None))
+        return steps
+
+    def __len__(self):
+        return self.meta['rows']
+
+    def __getitem__(self, row):
+        """The row as an object: None for failed notes and '' for text that is not JSON, as _parse_json gives."""
+        text = self._raw(row)
+        if text is not None:
+            return _parse_json(text)
+        layout = int(self.layout[row])
+        return None if layout == MISSING else self._decode(row, layout)
+
+    def _raw(self, row):
+        start, end = self.raw_offsets[row], self.raw_offsets[row + 1]
+        return self.raw[start:end].tobytes().decode('utf-8') if end > start else None
+
+    def _decode(self, row, layout):
+        kind, number, is_int, string = self.kind[row], self.number[row], self.is_int[row], self.string[row]
+        nodes = {(): {}}
+        for parent, key, path, leaf in self._steps[layout]:
+            if leaf is None:
+                nodes[parent][key] = nodes[path] = {}
+            elif kind[leaf] == NULL:
+                nodes[parent][key] = None
+            elif path in _NUMERIC_INDEX:
+                value = float(number[_NUMERIC_INDEX[path]])
+                nodes[parent][key] = int(value) if is_int[_NUMERIC_INDEX[path]] else value
+            elif path in _STRING_INDEX:
+                nodes[parent][key] = self.vocabulary[string[_STRING_INDEX[path]]]
+            else:
+                nodes[parent][key] = self._symptom_list(row)
+        return nodes[()]
+
+    def _symptom_list(self, row):
+        order = int(self.symptom_order[row])
+        if order >= 0:
+            return list(self._orders[order])
+        bits = int(self.symptoms[row])
+        return [symptom for i, symptom in enumerate(SYMPTOMS) if bits >> i & 1]
+
+    def json(self, row):
+        """The row exactly as it was written: the extractor's JSON string, or None for a failed note."""
+        text = self._raw(row)
+        if text is not None:
+            return text
+        layout = int(self.layout[row])
+        return None if layout == MISSING else _dumps(self._decode(row, layout))
+
+    def iter_json(self):
+        for row in range(len(self)):
+            yield self.json(row)
+
+    def numbers(self, path):
+        """A numeric column ('patient_info.age', 'vital_signs.heart_rate.value', ...) masked where it is not set."""
+        path = tuple(path.split('.'))
+        values = self.number[:, _NUMERIC_INDEX[path]]
+        return np.ma.masked_array(values, self.kind[:, _LEAF_INDEX[path]] != NUMBER)
+
+    def strings(self, path):
+        """Dictionary codes of a string column ('patient_info.gender', ...); -1 where it is not a string."""
+        return self.string[:, _STRING_INDEX[tuple(path.split('.'))]]
+
+    def has_symptom(self, symptom):
+        return (self.symptoms & np.uint64(1 << _SYMPTOM_INDEX[symptom])) != 0
+
+    def schema_columns(self, vocabulary=None):
+        """
+        The store as JSONvector.SchemaColumns without parsing any JSON, for compare_json_vectorized.
+
+        String codes are translated into `vocabulary` (extended in place), so the result can be compared with
+        SchemaColumns built on the same dict. Rows without columns decode their text for the compare_json
+        fallback.
+        """
+        vocabulary = {} if vocabulary is None else vocabulary
+        n = len(self)
+        layout = np.asarray(self.layout)
+        fits = layout >= 0
+        columns = SchemaColumns.__new__(SchemaColumns)
+        columns.objects = self
+        columns.vocabulary = vocabulary
+        columns.ok = fits
+
+        in_layout = np.zeros((len(self._steps) + 1, len(PATHS)), bool)
+        for code, layout_paths in enumerate(self.meta['layouts']):
+            in_layout[code, layout_paths] = True
+        # Rows without a layout use the extra all-False row at the end
+        present = in_layout[np.where(fits, layout, len(self._steps))]
+        columns.present = {path: present[:, i] for i, (path, _) in enumerate(PATHS)}
+
+        codes = np.array([vocabulary.setdefault(value, len(vocabulary)) for value in self.vocabulary] + [0], np.int64)
+        zeros, no_codes, no_items = np.zeros(n), np.zeros(n, np.int64), np.zeros(n, np.uint64)
+        columns.kind = {path: np.asarray(self.kind[:, i]) for i, path in enumerate(LEAF_PATHS)}
+        columns.number = {path: np.asarray(self.number[:, _NUMERIC_INDEX[path]]) if path in _NUMERIC_INDEX else zeros
+                          for path in LEAF_PATHS}
+        columns.string = {path: codes[self.string[:, _STRING_INDEX[path]]] if path in _STRING_INDEX else no_codes
+                          for path in LEAF_PATHS}
+        columns.items = {path: np.asarray(self.symptoms) if path == SYMPTOMS_PATH else no_items for path in LEAF_PATHS}
+        return columns
+
+    def rescore(self, truths, key_weight=0.25, value_weight=0.75, alpha=1.):
+        """
+        Scores every row against `truths` (another ResultStore, or objects or JSON strings) with the compare_json
+        rules, and returns (scores, {field: per-row scores}).
+
+        Field scores follow StreamingEvaluator: compare_json of the two values when both have the field, 0 when
+        only one does, NaN when neither does.
+        """
+        if isinstance(truths, ResultStore):
+            expected = truths.schema_columns()
+        else:
+            expected = SchemaColumns([_parse_json(t) if isinstance(t, str) else t for t in truths], {})
+        actual = self.schema_columns(expected.vocabulary)
+        scores, breakdown = compare_json_vectorized(expected, actual, key_weight, value_weight, alpha, breakdown=True)
+
+        fields = {}
+        for name, path in FIELDS.items():
+            has_expected, has_actual = expected.present[path], actual.present[path]
+            if path in _LEAF_INDEX:
+                has_expected = has_expected & (expected.kind[path] != NULL)
+                has_actual = has_actual & (actual.kind[path] != NULL)
+            both = has_expected & has_actual
+            fields[name] = np.where(both, breakdown['.'.join(path)], np.where(has_expected | has_actual, 0., np.nan))
+
+        # Rows scored by compare_json get their field scores the same way
+        for row in np.flatnonzero(~(expected.ok & actual.ok)):
+            truth, prediction = expected.objects[row], actual.objects[row]
+            for (name, value), (_, other) in zip(_field_values(truth), _field_values(prediction)):
+                if value is None and other is None:
+                    fields[name][row] = np.nan
+                elif value is None or other is None:
+                    fields[name][row] = 0.
+                else:
+                    fields[name][row] = compare_json(value, other, key_weight, value_weight, alpha)
+        return scores, fields
+
+    def fields(self):
+        """The stored per-field scores as {field: column}; None when the store was written without truths."""
+        if self.field_scores is None:
+            return None
+        return {name: self.field_scores[:, i] for i, name in enumerate(self.meta['fields'])}
+
+    def summary(self):
+        layout = np.asarray(self.layout)
+        summary = {'rows': len(self), 'columnar': int((layout >= 0).sum()), 'raw_only': int((layout == RAW).sum()),
+                   'missing': int((layout == MISSING).sum()), 'seconds': float(np.nansum(self.seconds))}
+        if self.score is not None:
+            summary['mean_score'] = float(np.mean(self.score)) if len(self) else None
+            summary['field_means'] = {name: float(np.nanmean(values)) if (~np.isnan(values)).any() else None
+                                      for name, values in self.fields().items()}
+        return summary
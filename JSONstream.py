@@ -0,0 +1,168 @@
+import json
+import re
+
+NUMBER = re.compile(r'-?(0|[1-9][0-9]*)(\.[0-9]+)?([eE][+-]?[0-9]+)?')
+NUMBER_CHARS = set('0123456789+-.eE')
+# Python literals and trailing commas are let through because JSONrepair.repair_json fixes them locally
+LITERALS = ('true', 'false', 'null', 'True', 'False', 'None')
+WHITESPACE = ' \t\r\n'
+
+class StreamAborted(json.JSONDecodeError):
+    pass
+
+class JSONStreamScanner:
+    """
+    Incremental JSON syntax checker for streamed model output.
+
+    Text is fed in chunks as tokens arrive. feed returns True as soon as the top-level object closes, and
+    `text` then holds exactly that object with any trailing chatter dropped. As soon as the stream can no longer
+    become valid JSON it raises StreamAborted (a json.JSONDecodeError), so the caller can cancel generation
+    rather than wait for the rest of a bad answer. Defects that repair_json can fix are tolerated. Up to
+    `max_preamble` characters before the opening brace (a code fence, a short sentence) are skipped.
+
+    >>> scanner = JSONStreamScanner()
+    >>> scanner.feed('{"a": [1, ')
+    False
+    >>> scanner.feed('2]} thanks!')
+    True
+    >>> scanner.text
+    '{"a": [1, 2]}'
+    """
+
+    def __init__(self, max_preamble=200):
+        self.max_preamble = max_preamble
+        self.seen = []
+        self.start = None
+        self.end = None
+        self.stack = []
+        self.state = 'preamble'
+        self.token = ''
+        self.pos = 0
+
+    @property
+    def text(self):
+        raw = ''.join(self.seen)
+        return raw[self.start:self.end]
+
+    @property
+    def done(self):
+        return self.end is not None
+
+    def feed(self, chunk):
+        if self.done:
+            return True
+        self.seen.append(chunk)
+        for char in chunk:
+            self._step(char)
+            self.pos += 1
+            if self.done:
+                return True
+        return False
+
+    def finish(self):
+        """Raises if the stream ended before the top-level object closed."""
+        if not self.done:
+            self._fail('Unterminated JSON object')
+
+    def _fail(self, message):
+        raise StreamAborted(message, ''.join(self.seen), self.pos)
+
+    def _step(self, char):
+        state = self.state
+
+        if state == 'preamble':
+            if char == '{':
+                self.start = self.pos
+                self.stack.append('}')
+                self.state = 'key_or_end'
+            elif self.pos >= self.max_preamble:
+                self._fail('No JSON object in preamble')
+            return
+
+        if state == 'string':
+            if self.token.startswith('\\u'):
+                if char not in '0123456789abcdefABCDEF':
+                    self._fail('Invalid \\u escape')
+                self.token = '' if len(self.token) == 5 else self.token + char
+            elif self.token == 'escape':
+                if char == 'u':
+                    self.token = '\\u'
+                elif char in '"\\/bfnrt':
+                    self.token = ''
+                else:
+                    self._fail('Invalid escape')
+            elif char == '\\':
+                self.token = 'escape'
+            elif char == '"':
+                self.state = 'colon' if self.key else 'after_value'
+            elif char < ' ':
+                self._fail('Control character in string')
+            return
+
+        if state == 'number':
+            if char in NUMBER_CHARS:
+                self.token += char
+                return
+            if not NUMBER.fullmatch(self.token):
+                self._fail('Invalid number')
+            self.state = 'after_value'
+            self._step(char)
+            return
+
+        if state == 'literal':
+            self.token += char
+            if self.token in LITERALS:
+                self.state = 'after_value'
+            elif not any(literal.startswith(self.token) for literal in LITERALS):
+                self._fail('Invalid literal')
+            return
+
+        if char in WHITESPACE:
+            return
+
+        if state == 'key_or_end':
+            if char == '"':
+                self.state, self.key, self.token = 'string', True, ''
+            elif char == '}':
+                self._close(char)
+            else:
+                self._fail('Expecting property name')
+        elif state == 'colon':
+            if char != ':':
+                self._fail("Expecting ':'")
+            self.state = 'value'
+        elif state in ('value', 'value_or_end'):
+            if char == ']' and state == 'value_or_end':
+                self._close(char)
+            else:
+                self._value(char)
+        elif state == 'after_value':
+            if char == ',':
+                self.state = 'key_or_end' if self.stack[-1] == '}' else 'value_or_end'
+            elif char in '}]':
+                self._close(char)
+            else:
+                self._fail("Expecting ',' or closing bracket")
+
+    def _value(self, char):
+        if char == '{':
+            self.stack.append('}')
+            self.state = 'key_or_end'
+        elif char == '[':
+            self.stack.append(']')
+            self.state = 'value_or_end'
+        elif char == '"':
+            self.state, self.key, self.token = 'string', False, ''
+        elif char in '-0123456789':
+            self.state, self.token = 'number', char
+        elif char in 'tfnTFN':
+            self.state, self.token = 'literal', char
+        else:
+            self._fail('Expecting value')
+
+    def _close(self, char):
+        if self.stack.pop() != char:
+            self._fail('Mismatched bracket')
+        self.state = 'after_value'
+        if not self.stack:
+            self.end = self.pos + 1
@@ -0,0 +1,95 @@
+from JSONschema import AGE_RANGE
+from JSONschema import BLOOD_PRESSURE_PARTS
+from JSONschema import BLOOD_PRESSURE_UNITS
+from JSONschema import GENDERS
+from JSONschema import PATIENT_INFO_KEYS
+from JSONschema import SYMPTOMS
+from JSONschema import TOP_LEVEL_KEYS
+from JSONschema import VISIT_MOTIVATIONS
+from JSONschema import VITAL_RANGES
+from JSONschema import VITAL_UNITS
+
+_SYMPTOMS = set(SYMPTOMS)
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _check_range(problems, path, value, bounds):
+    low, high = bounds
+    if not low <= value <= high:
+        problems.append(f'{path} {value} outside {low}-{high}')
+
+def _check_reading(problems, path, reading, units, bounds):
+    if not isinstance(reading, dict) or set(reading) != {'value', 'unit'}:
+        problems.append(f'{path} is not a {{value, unit}} reading')
+        return
+    value, unit = reading['value'], reading['unit']
+    if not _is_number(value):
+        problems.append(f'{path}.value is not a number')
+    elif unit in units:
+        _check_range(problems, f'{path}.value', value, bounds or VITAL_RANGES[unit])
+    if unit not in units:
+        problems.append(f'{path}.unit {unit!r} not in {units}')
+
+def validate_extraction(data):
+    """
+    Strictly checks an extraction against the schema in JSONschema.py and returns a list of problems.
+
+    An empty list means the extraction is valid: only known keys, enum values for gender, visit_motivation and
+    symptoms, integer ages, atomic vitals with a numeric value and an allowed unit (blood pressure with both
+    systolic and diastolic), and every number inside its plausible range.
+
+    >>> validate_extraction({"visit_motivation": "Asthma", "symptoms": ["cough", "cough"]})
+    ['symptoms has duplicates']
+    >>> validate_extraction({"vital_signs": {"blood_pressure": {"systolic": {"value": 120, "unit": "mmHg"}}}})
+    ['vital_signs.blood_pressure must hold both systolic and diastolic readings']
+    """
+    if not isinstance(data, dict):
+        return ['extraction is not an object']
+    problems = [f'unknown key {key!r}' for key in data if key not in TOP_LEVEL_KEYS]
+
+    patient_info = data.get('patient_info', {})
+    if not isinstance(patient_info, dict):
+        problems.append('patient_info is not an object')
+        patient_info = {}
+    problems += [f'unknown key patient_info.{key}' for key in patient_info if key not in PATIENT_INFO_KEYS]
+    if 'age' in patient_info:
+        age = patient_info['age']
+        if not isinstance(age, int) or isinstance(age, bool):
+            problems.append('patient_info.age is not an integer')
+        else:
+            _check_range(problems, 'patient_info.age', age, AGE_RANGE)
+    if 'gender' in patient_info and patient_info['gender'] not in GENDERS:
+        problems.append(f'patient_info.gender {patient_info["gender"]!r} not in {GENDERS}')
+
+    if 'visit_motivation' in data and data['visit_motivation'] not in VISIT_MOTIVATIONS:
+        problems.append(f'visit_motivation {data["visit_motivation"]!r} not in the enum')
+
+    symptoms = data.get('symptoms', [])
+    if not isinstance(symptoms, list):
+        problems.append('symptoms is not a list')
+    else:
+        for symptom in symptoms:
+            if not isinstance(symptom, str):
+                problems.append(f'symptom {symptom!r} is not a string')
+            elif symptom not in _SYMPTOMS:
+                problems.append(f'symptom {symptom!r} not in the enum')
+        if len(set(map(str, symptoms))) != len(symptoms):
+            problems.append('symptoms has duplicates')
+
+    vital_signs = data.get('vital_signs', {})
+    if not isinstance(vital_signs, dict):
+        return problems + ['vital_signs is not an object']
+    for key, reading in vital_signs.items():
+        path = f'vital_signs.{key}'
+        if key == 'blood_pressure':
+            if not isinstance(reading, dict) or set(reading) != set(BLOOD_PRESSURE_PARTS):
+                problems.append(f'{path} must hold both systolic and diastolic readings')
+                continue
+            for part, value in reading.items():
+                _check_reading(problems, f'{path}.{part}', value, BLOOD_PRESSURE_UNITS, VITAL_RANGES[part])
+        elif key in VITAL_UNITS:
+            _check_reading(problems, path, reading, VITAL_UNITS[key], VITAL_RANGES.get(key))
+        else:
+            problems.append(f'unknown key {path}')
+    return problems
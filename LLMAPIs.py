@@ -1,22 +1,284 @@
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeout
+from concurrent.futures import wait
+
+import httpx
 from ollama import chat
 from ollama import ChatResponse
+from ollama import Client
+from ollama import ResponseError
+from pydantic import ValidationError
 
-def get_response(model, system_prompt, user_prompt, format=None):
-
-    if format is None:
-        response: ChatResponse = chat(model=model, messages=[
-            {
-                'role': 'system',
-                'content': f'{system_prompt}'
-            },
-            {
-                'role': 'user',
-                'content': f'{user_prompt}'
-            },
-            ])
-        return response.message.content
-    else:
-        response: ChatResponse = chat(model=model, messages=[
+from JSONstream import JSONStreamScanner
+from LLMtrace import response_metrics
+from LLMtrace import trace_call
+from LLMtrace import trace_event
+
+_cache = None
+
+class RequestCancelled(Exception):
+    """Raised by get_response when its `cancel` event is set before or while the model is generating."""
+
+class OllamaClient:
+    """
+    Reusable Ollama client that owns one pooled HTTP connection.
+
+    Pass it as `client=` to get_response or any JSONcreate function to reuse connections, apply timeouts and
+    control how long the server keeps the model loaded. warm_up loads a model before the first note so that note
+    does not pay the load time. By default warm_up also pins the model, so it stays loaded until unload is called.
+
+    >>> client = OllamaClient(timeout=120, keep_alive='30m')
+    >>> client.warm_up('gpt-oss')
+    >>> get_json_full('gpt-oss', notes, client=client)
+    """
+
+    def __init__(self, host=None, timeout=300, max_connections=16, keep_alive=None, options=None):
+        self.keep_alive = keep_alive
+        self.options = options
+        self.pinned = set()
+        self._client = Client(host=host, timeout=timeout,
+                              limits=httpx.Limits(max_connections=max_connections,
+                                                  max_keepalive_connections=max_connections))
+
+    def chat(self, model, messages, **kwargs):
+        # Every request resets the server-side keep-alive, so pinned models must keep asking for -1
+        kwargs.setdefault('keep_alive', -1 if model in self.pinned else self.keep_alive)
+        if self.options is not None:
+            kwargs.setdefault('options', self.options)
+        return self._client.chat(model=model, messages=messages, **kwargs)
+
+    def warm_up(self, *models, pin=True):
+        """Loads each model into memory. An empty chat makes Ollama load the weights without generating."""
+        for model in models:
+            if pin:
+                self.pinned.add(model)
+            self.chat(model, [])
+
+    def unload(self, *models):
+        for model in models:
+            self.pinned.discard(model)
+            self._client.chat(model=model, messages=[], keep_alive=0)
+
+    def close(self):
+        self._client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+class _Endpoint:
+    def __init__(self, host, limit, client):
+        self.host = host
+        self.limit = limit
+        self.client = client
+        self.outstanding = 0
+        self.failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.
+        self.stats = {'requests': 0, 'errors': 0, 'ejections': 0}
+
+# What a request can fail with for reasons outside the caller's code: the connection, a timeout, or an error
+# answer from the server
+REQUEST_ERRORS = (httpx.TransportError, ConnectionError, ResponseError)
+
+def _is_endpoint_failure(error):
+    # Connection problems, timeouts and server-side errors say something about the box, not the request
+    if isinstance(error, (httpx.TransportError, ConnectionError)):
+        return True
+    return isinstance(error, ResponseError) and error.status_code >= 500
+
+class EndpointPool:
+    """
+    Spreads chat requests over several Ollama servers and can be passed as `client=` anywhere an OllamaClient can.
+
+    Each request goes to the healthy endpoint with the fewest requests in flight relative to its limit, and
+    waits when every endpoint is at its limit. `hosts` is a list of URLs, or of (URL, limit) pairs to override
+    `max_concurrency` per host. An endpoint that fails `eject_after` times in a row (connection errors,
+    timeouts, 5xx) is ejected for `backoff` seconds, doubling on each ejection up to `max_backoff`, and then
+    gets one probe request. A failed request is retried on another endpoint up to `retries` times.
+
+    With `hedge_after` set, a non-streaming request that has not answered within that many seconds is also sent
+    to a second idle endpoint, and the first answer wins. The slower request is left to finish in the
+    background, so hedging trades GPU time for tail latency.
+
+    >>> pool = EndpointPool(['http://gpu1:11434', ('http://gpu2:11434', 8)], max_concurrency=4, hedge_after=20)
+    >>> pool.warm_up('gpt-oss')
+    >>> extract_batch('gpt-oss', data['Note'], concurrency=12, client=pool)
+    """
+
+    def __init__(self, hosts, max_concurrency=4, timeout=300, keep_alive=None, options=None, eject_after=3,
+                 backoff=1., max_backoff=60., retries=None, hedge_after=None):
+        self.endpoints = []
+        for host in hosts:
+            host, limit = (host, max_concurrency) if isinstance(host, str) else host
+            client = OllamaClient(host, timeout, max(16, 2 * limit), keep_alive, options)
+            self.endpoints.append(_Endpoint(host, limit, client))
+        self.eject_after = eject_after
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retries = len(self.endpoints) if retries is None else retries
+        self.hedge_after = hedge_after
+        self.hedges = {'sent': 0, 'won': 0}
+        self._condition = threading.Condition()
+        self._executor = None
+        if hedge_after is not None:
+            self._executor = ThreadPoolExecutor(max_workers=2 * sum(e.limit for e in self.endpoints))
+
+    def _pick(self, exclude, now):
+        # An endpoint back from ejection takes a single probe request until one succeeds
+        candidates = [e for e in self.endpoints
+                      if e not in exclude and e.outstanding < (1 if e.ejections else e.limit) and e.ejected_until <= now]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda e: e.outstanding / e.limit)
+
+    def _acquire(self, exclude=(), block=True):
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                endpoint = self._pick(exclude, now)
+                if endpoint is not None:
+                    endpoint.outstanding += 1
+                    endpoint.stats['requests'] += 1
+                    return endpoint
+                remaining = [e for e in self.endpoints if e not in exclude]
+                if not block or not remaining:
+                    return None
+                # Wake when a slot frees up or the next ejected endpoint is due for its probe
+                due = [e.ejected_until - now for e in remaining if e.ejected_until > now]
+                self._condition.wait(min(due) if due else None)
+
+    def _release(self, endpoint, error=None):
+        with self._condition:
+            endpoint.outstanding -= 1
+            if error is None:
+                endpoint.failures = 0
+                endpoint.ejections = 0
+            elif _is_endpoint_failure(error):
+                endpoint.stats['errors'] += 1
+                endpoint.failures += 1
+                if endpoint.failures >= self.eject_after or endpoint.ejections:
+                    # A failed probe goes straight back out, for twice as long
+                    delay = min(self.max_backoff, self.backoff * 2 ** endpoint.ejections)
+                    endpoint.ejected_until = time.monotonic() + delay
+                    endpoint.ejections += 1
+                    endpoint.failures = 0
+                    endpoint.stats['ejections'] += 1
+            self._condition.notify_all()
+
+    def _send(self, endpoint, model, messages, kwargs):
+        try:
+            response = endpoint.client.chat(model, messages, **kwargs)
+        except Exception as error:
+            self._release(endpoint, error)
+            raise
+        self._release(endpoint)
+        return response
+
+    def _stream(self, endpoint, chunks, first):
+        try:
+            if first is not None:
+                yield first
+            yield from chunks
+        except Exception as error:
+            self._release(endpoint, error)
+            raise
+        except GeneratorExit:
+            # The reader stopped early (see _read_json_stream); the endpoint itself is fine
+            chunks.close()
+            self._release(endpoint)
+            raise
+        self._release(endpoint)
+
+    def _hedged(self, endpoint, model, messages, kwargs):
+        primary = self._executor.submit(self._send, endpoint, model, messages, kwargs)
+        try:
+            return primary.result(timeout=self.hedge_after)
+        except FuturesTimeout:
+            pass
+        backup = self._acquire(exclude=(endpoint,), block=False)
+        if backup is None:
+            return primary.result()
+        with self._condition:
+            self.hedges['sent'] += 1
+        second = self._executor.submit(self._send, backup, model, messages, kwargs)
+        futures = {primary, second}
+        while True:
+            done, futures = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        with self._condition:
+                            self.hedges['won'] += 1
+                    return future.result()
+            if not futures:
+                return done.pop().result()
+
+    def chat(self, model, messages, **kwargs):
+        tried = []
+        error = None
+        for _ in range(max(1, self.retries)):
+            endpoint = self._acquire(exclude=tried) or self._acquire()
+            try:
+                if kwargs.get('stream'):
+                    try:
+                        chunks = endpoint.client.chat(model, messages, **kwargs)
+                        # Pull the first chunk here so a dead endpoint can still fail over
+                        first = next(chunks, None)
+                    except Exception as e:
+                        self._release(endpoint, e)
+                        raise
+                    return self._stream(endpoint, chunks, first)
+                if self._executor is not None:
+                    return self._hedged(endpoint, model, messages, kwargs)
+                return self._send(endpoint, model, messages, kwargs)
+            except Exception as e:
+                if not _is_endpoint_failure(e):
+                    raise
+                error = e
+                tried.append(endpoint)
+        raise error
+
+    def warm_up(self, *models, pin=True):
+        for endpoint in self.endpoints:
+            endpoint.client.warm_up(*models, pin=pin)
+
+    def unload(self, *models):
+        for endpoint in self.endpoints:
+            endpoint.client.unload(*models)
+
+    def stats(self):
+        """Per-host request, error and ejection counts, and how many hedges were sent and won."""
+        with self._condition:
+            hosts = {e.host: {**e.stats, 'outstanding': e.outstanding,
+                              'ejected': e.ejected_until > time.monotonic()} for e in self.endpoints}
+            return {'hosts': hosts, 'hedges': dict(self.hedges)}
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        for endpoint in self.endpoints:
+            endpoint.client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+def set_cache(cache):
+    """Sets the ResponseCache (see LLMcache.py) that get_response uses by default. None turns caching off."""
+    global _cache
+    _cache = cache
+
+def _chat(model, system_prompt, user_prompt, format=None, client=None, stream=False, call=None, cancel=None):
+    messages = [
         {
             'role': 'system',
             'content': f'{system_prompt}'
@@ -25,7 +287,97 @@ def get_response(model, system_prompt, user_prompt, format=None):
             'role': 'user',
             'content': f'{user_prompt}'
         },
-        ],
-        format=format.model_json_schema())
+        ]
+    send = chat if client is None else client.chat
+    kwargs = {} if format is None else {'format': format if isinstance(format, str) else format.model_json_schema()}
+    if cancel is not None and cancel.is_set():
+        raise RequestCancelled()
+    if stream:
+        return _read_json_stream(send(model=model, messages=messages, stream=True, **kwargs), call, cancel)
+    response: ChatResponse = send(model=model, messages=messages, **kwargs)
+    if call is not None:
+        call['metrics'] = response_metrics(response)
+    return response.message.content
+
+def _read_json_stream(stream, call=None, cancel=None):
+    scanner = JSONStreamScanner()
+    chunks = 0
+    try:
+        for chunk in stream:
+            if cancel is not None and cancel.is_set():
+                raise RequestCancelled()
+            chunks += 1
+            if chunk.done and call is not None:
+                call['metrics'] = response_metrics(chunk)
+            if scanner.feed(chunk.message.content):
+                break
+        scanner.finish()
+    finally:
+        # Closing the stream drops the connection, which makes Ollama stop generating
+        stream.close()
+        if call is not None and call['metrics'] is None:
+            # Stopped before Ollama's final chunk, which carries the metrics; Ollama streams about one token per
+            # chunk, so the chunk count stands in for eval_count
+            call['metrics'] = {'eval_count': chunks}
+            call['partial_metrics'] = True
+    return scanner.text
+
+def get_response(model, system_prompt, user_prompt, format=None, client=None, cache=None, refresh=False,
+                 stream=False, tags=None, cancel=None):
+    """
+    Sends one chat request and returns the text response, or the validated `format` model when one is given.
+    `format` may also be the string 'json', which turns on Ollama's JSON mode and still returns the text.
+
+    `client` is an OllamaClient or EndpointPool; without one the module-level ollama.chat and its default host are
+    used.
+
+    `cache` is a ResponseCache, False to bypass caching for this call, or None to use the one from set_cache.
+    Setting the LLMCACHE_DISABLE environment variable bypasses caching everywhere. With `refresh` the cached
+    entry is ignored and overwritten, which is what a retry after a bad response wants.
+
+    With `stream` the response is parsed token by token and returned as soon as the top-level JSON object closes,
+    ignoring anything after it. If the output stops being valid JSON, generation is cancelled right away and
+    JSONstream.StreamAborted (a json.JSONDecodeError) is raised.
+
+    Every call is reported to the sinks registered in LLMtrace.py with its wall time, Ollama's token counts and
+    durations, and `tags` (a dict such as {"attempt": 1} or {"segment": "symptoms"}).
+
+    `cancel` is an optional threading.Event. Once it is set, get_response raises RequestCancelled instead of
+    sending the request, or, while streaming, at the next token and closes the stream so the server stops
+    generating.
+    """
+    start = time.perf_counter()
+    call = {'metrics': None, 'cache_hit': False, 'partial_metrics': False}
+    try:
+        result = _get_response(model, system_prompt, user_prompt, format, client, cache, refresh, stream, call,
+                               cancel)
+    except Exception as error:
+        trace_call(model, start, call['metrics'], tags, call['cache_hit'], stream, error, call['partial_metrics'])
+        if isinstance(error, ValidationError):
+            trace_event('validation_failure', model, tags, error)
+        raise
+    trace_call(model, start, call['metrics'], tags, call['cache_hit'], stream,
+               partial_metrics=call['partial_metrics'])
+    return result
+
+def _get_response(model, system_prompt, user_prompt, format, client, cache, refresh, stream, call, cancel):
+    if cache is None:
+        cache = _cache
+    if not cache or os.environ.get('LLMCACHE_DISABLE'):
+        content = _chat(model, system_prompt, user_prompt, format, client, stream, call, cancel)
+    else:
+        key = cache.key(model, system_prompt, user_prompt, format)
+        content = None if refresh else cache.get(key)
+        call['cache_hit'] = content is not None
+        if content is None:
+            content = _chat(model, system_prompt, user_prompt, format, client, stream, call, cancel)
+            if format is not None and not isinstance(format, str):
+                # Only responses that validate are worth caching
+                result = format.model_validate_json(content)
+                cache.put(key, content)
+                return result
+            cache.put(key, content)
 
-        return format.model_validate_json(response.message.content)
\ No newline at end of file
+    if format is None or isinstance(format, str):
+        return content
+    return format.model_validate_json(content)
@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+class ResponseCache:
+    """
+    Persistent, content-addressed cache of raw model responses.
+
+    Entries live in a SQLite database so any number of threads and processes can share one cache directory.
+    The key is a SHA-256 of the model name, both prompts and the `format` JSON schema. When the stored responses
+    grow past `max_bytes` the least recently used entries are evicted. Hit and miss counts are stored alongside
+    the entries so they add up across processes.
+
+    >>> cache = ResponseCache('.llmcache')
+    >>> set_cache(cache)  # from LLMAPIs
+    >>> cache.stats()
+    {'hits': 0, 'misses': 0, 'entries': 0, 'bytes': 0}
+    """
+
+    def __init__(self, path='.llmcache', max_bytes=512 * 1024 * 1024):
+        os.makedirs(path, exist_ok=True)
+        self.path = os.path.join(path, 'responses.sqlite3')
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS responses ('
+                         'key TEXT PRIMARY KEY, content TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)')
+            conn.execute('CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+            conn.execute("INSERT OR IGNORE INTO counters VALUES ('hits', 0), ('misses', 0)")
+            # Running total of stored bytes, kept by triggers so every writer in every process updates it in the
+            # same statement, and eviction checks never have to sum the table
+            conn.execute("INSERT OR IGNORE INTO counters SELECT 'bytes', COALESCE(SUM(size), 0) FROM responses")
+            conn.execute("CREATE TRIGGER IF NOT EXISTS responses_insert AFTER INSERT ON responses BEGIN "
+                         "UPDATE counters SET value = value + NEW.size WHERE name = 'bytes'; END")
+            conn.execute("CREATE TRIGGER IF NOT EXISTS responses_update AFTER UPDATE OF size ON responses BEGIN "
+                         "UPDATE counters SET value = value + NEW.size - OLD.size WHERE name = 'bytes'; END")
+            conn.execute("CREATE TRIGGER IF NOT EXISTS responses_delete AFTER DELETE ON responses BEGIN "
+                         "UPDATE counters SET value = value - OLD.size WHERE name = 'bytes'; END")
+
+    def _connect(self):
+        # sqlite3 connections cannot be shared between threads, so each thread opens its own
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def key(model, system_prompt, user_prompt, format=None):
+        schema = format if format is None or isinstance(format, str) else format.model_json_schema()
+        payload = json.dumps([model, system_prompt, user_prompt, schema], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Returns the cached response text for `key`, or None on a miss."""
+        with self._connect() as conn:
+            row = conn.execute('SELECT content FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                conn.execute("UPDATE counters SET value = value + 1 WHERE name = 'misses'")
+                return None
+            conn.execute('UPDATE responses SET last_used = ? WHERE key = ?', (time.time(), key))
+            conn.execute("UPDATE counters SET value = value + 1 WHERE name = 'hits'")
+            return row[0]
+
+    def put(self, key, content):
+        size = len(content.encode('utf-8'))
+        with self._connect() as conn:
+            # An upsert rather than INSERT OR REPLACE, whose implicit delete would not fire the bytes trigger
+            conn.execute('INSERT INTO responses VALUES (?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+                         'content = excluded.content, size = excluded.size, last_used = excluded.last_used',
+                         (key, content, size, time.time()))
+            total = conn.execute("SELECT value FROM counters WHERE name = 'bytes'").fetchone()[0]
+            if total > self.max_bytes:
+                self._evict(conn, total - self.max_bytes)
+
+    def _evict(self, conn, excess):
+        freed = 0
+        evicted = []
+        for key, size in conn.execute('SELECT key, size FROM responses ORDER BY last_used'):
+            if freed >= excess:
+                break
+            evicted.append((key,))
+            freed += size
+        conn.executemany('DELETE FROM responses WHERE key = ?', evicted)
+
+    def discard(self, key):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM responses')
+            conn.execute('UPDATE counters SET value = 0')
+
+    def stats(self):
+        conn = self._connect()
+        counters = dict(conn.execute('SELECT name, value FROM counters'))
+        entries = conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+        return {'hits': counters['hits'], 'misses': counters['misses'], 'entries': entries, 'bytes': counters['bytes']}
@@ -0,0 +1,149 @@
+import json
+import threading
+import time
+from collections import defaultdict
+from dataclasses import asdict
+from dataclasses import dataclass
+from dataclasses import field
+
+# Timing and token fields Ollama returns on a finished ChatResponse; durations arrive in nanoseconds
+METRIC_FIELDS = ['total_duration', 'load_duration', 'prompt_eval_count', 'prompt_eval_duration',
+                 'eval_count', 'eval_duration']
+
+_sinks = []
+_sinks_lock = threading.Lock()
+
+@dataclass
+class CallRecord:
+    """
+    One traced event: a get_response call, or a failure the pipeline recovered from.
+
+    `event` is "call" for model requests, or "parse_failure"/"validation_failure" when get_json_full rejects an
+    answer. `tags` carry pipeline context such as the retry attempt, the segment name or a note id. Durations
+    are in seconds. `partial_metrics` marks streamed calls stopped before Ollama's final chunk: they have no
+    durations or prompt counts, and eval_count is the number of chunks read.
+    """
+    event: str
+    model: str
+    tags: dict = field(default_factory=dict)
+    wall_seconds: float = 0.
+    cache_hit: bool = False
+    stream: bool = False
+    error: str | None = None
+    total_duration: float | None = None
+    load_duration: float | None = None
+    prompt_eval_count: int | None = None
+    prompt_eval_duration: float | None = None
+    eval_count: int | None = None
+    eval_duration: float | None = None
+    partial_metrics: bool = False
+    timestamp: float = field(default_factory=time.time)
+
+def add_sink(sink):
+    """Registers a sink; every traced event is passed to sink.record(CallRecord)."""
+    with _sinks_lock:
+        _sinks.append(sink)
+    return sink
+
+def remove_sink(sink):
+    with _sinks_lock:
+        _sinks.remove(sink)
+
+def enabled():
+    return bool(_sinks)
+
+def emit(record):
+    for sink in list(_sinks):
+        sink.record(record)
+
+def response_metrics(response):
+    """Pulls token counts and durations (converted to seconds) off an Ollama ChatResponse."""
+    metrics = {}
+    for name in METRIC_FIELDS:
+        value = getattr(response, name, None)
+        if value is not None and name.endswith('_duration'):
+            value = value / 1e9
+        metrics[name] = value
+    return metrics
+
+def trace_call(model, start, metrics=None, tags=None, cache_hit=False, stream=False, error=None,
+               partial_metrics=False):
+    if not _sinks:
+        return
+    emit(CallRecord('call', model, dict(tags or {}), time.perf_counter() - start, cache_hit, stream,
+                    type(error).__name__ if error is not None else None, **(metrics or {}),
+                    partial_metrics=partial_metrics))
+
+def trace_event(event, model, tags=None, error=None):
+    if not _sinks:
+        return
+    emit(CallRecord(event, model, dict(tags or {}), error=str(error) if error is not None else None))
+
+def _label(tags):
+    return tags.get('segment') or tags.get('path') or ''
+
+class MemorySink:
+    """
+    Keeps running totals per (event, model, path/segment, status) in memory.
+
+    summary() returns them as a dict, and prometheus() renders them in the Prometheus text exposition format.
+    Status is "ok", "error", "cache_hit", or "stream_stopped" for streamed calls read only up to the end of the
+    JSON object, whose token totals are chunk counts without durations.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.totals = defaultdict(lambda: defaultdict(float))
+
+    def record(self, record):
+        status = ('error' if record.error else 'cache_hit' if record.cache_hit
+                  else 'stream_stopped' if record.partial_metrics else 'ok')
+        key = (record.event, record.model, _label(record.tags), status)
+        with self.lock:
+            totals = self.totals[key]
+            totals['count'] += 1
+            totals['wall_seconds'] += record.wall_seconds
+            totals['retries'] += record.tags.get('attempt', 0) > 0
+            for name in METRIC_FIELDS:
+                value = getattr(record, name)
+                if value is not None:
+                    totals[name] += value
+
+    def summary(self):
+        with self.lock:
+            return [{'event': event, 'model': model, 'path': path, 'status': status, **totals}
+                    for (event, model, path, status), totals in self.totals.items()]
+
+    def prometheus(self, prefix='mednotes'):
+        metrics = {
+            'count': ('llm_events_total', 'counter'),
+            'retries': ('llm_retries_total', 'counter'),
+            'wall_seconds': ('llm_wall_seconds_total', 'counter'),
+            'total_duration': ('llm_total_duration_seconds_total', 'counter'),
+            'load_duration': ('llm_load_duration_seconds_total', 'counter'),
+            'prompt_eval_count': ('llm_prompt_tokens_total', 'counter'),
+            'prompt_eval_duration': ('llm_prompt_eval_seconds_total', 'counter'),
+            'eval_count': ('llm_completion_tokens_total', 'counter'),
+            'eval_duration': ('llm_eval_seconds_total', 'counter'),
+        }
+        rows = self.summary()
+        lines = []
+        for key, (name, kind) in metrics.items():
+            lines.append(f'# TYPE {prefix}_{name} {kind}')
+            for row in rows:
+                labels = ','.join(f'{label}="{row[label]}"' for label in ('event', 'model', 'path', 'status'))
+                lines.append(f'{prefix}_{name}{{{labels}}} {row.get(key, 0.):g}')
+        return '\n'.join(lines) + '\n'
+
+class JSONLSink:
+    """Appends every record as one JSON line to `path`."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def record(self, record):
+        line = json.dumps(asdict(record), ensure_ascii=False)
+        with self.lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
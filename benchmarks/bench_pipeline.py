@@ -0,0 +1,160 @@
+"""
+End-to-end benchmark of the extraction paths against the local fake Ollama server.
+
+Reports throughput, p50/p95/p99 latency, retry/repair counts and compare_json accuracy per mode, and writes
+them as JSON so runs can be compared across commits.
+
+    python benchmarks/bench_pipeline.py --notes 50 --latency 0.2 --malformed-rate 0.1 --output bench.json
+    python benchmarks/bench_pipeline.py --csv data/train.csv --notes 100 --modes full,batch
+    python benchmarks/bench_pipeline.py --endpoints 3 --hedge-after 0.5 --modes batch
+"""
+
+import argparse
+import csv
+import json
+import subprocess
+import time
+from contextlib import ExitStack
+
+from fake_ollama import FakeOllama
+from synthetic import make_dataset
+import JSONcreate
+from JSONcreate import cascade_report
+from JSONcreate import extract_batch
+from JSONcreate import get_json_cascade
+from JSONcreate import get_json_chunked
+from JSONcreate import get_json_full
+from JSONcreate import get_json_hybrid
+from JSONcreate import get_json_segment
+from JSONevalute import compare_json
+from LLMAPIs import EndpointPool
+from LLMAPIs import OllamaClient
+
+MODES = ['full', 'segment', 'hybrid', 'batch', 'batch_segment', 'packed', 'cascade', 'chunked']
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def load_csv(path, limit):
+    pairs = []
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            pairs.append((row['Note'], json.loads(row['json'])))
+            if len(pairs) >= limit:
+                break
+    return pairs
+
+def run_sequential(extract, model, notes, **kwargs):
+    outputs, latencies, errors = [], [], 0
+    for note in notes:
+        start = time.perf_counter()
+        try:
+            outputs.append(extract(model, note, **kwargs))
+        except Exception:
+            outputs.append(None)
+            errors += 1
+        latencies.append(time.perf_counter() - start)
+    return outputs, latencies, errors
+
+def run_mode(mode, model, notes, args, client):
+    kwargs = {'client': client, 'stream': args.stream}
+    if mode == 'full':
+        return run_sequential(get_json_full, model, notes, **kwargs)
+    if mode == 'segment':
+        return run_sequential(get_json_segment, model, notes, **{'client': client})
+    if mode == 'hybrid':
+        return run_sequential(get_json_hybrid, model, notes, **{'client': client})
+    if mode == 'chunked':
+        return run_sequential(get_json_chunked, model, notes, chunk_budget=args.chunk_budget, **kwargs)
+    if mode == 'batch_segment':
+        results = extract_batch(model, notes, args.concurrency, get_json_segment, client=client)
+    elif mode == 'cascade':
+        results = extract_batch(model, notes, args.concurrency, get_json_cascade, fast_model=args.fast_model, **kwargs)
+    elif mode == 'packed':
+        results = extract_batch(model, notes, args.concurrency, pack=args.pack, token_budget=args.token_budget,
+                                **kwargs)
+    else:
+        results = extract_batch(model, notes, args.concurrency, **kwargs)
+    return ([r.json for r in results], [r.seconds for r in results], sum(not r.ok for r in results))
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--notes', type=int, default=40)
+    parser.add_argument('--csv', help='CSV with Note and json columns; synthetic notes are used otherwise')
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--model', default='fake')
+    parser.add_argument('--fast-model', default='fake-small', help='First model tried in cascade mode')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--pack', type=int, default=4)
+    parser.add_argument('--token-budget', type=int, default=None)
+    parser.add_argument('--stream', action='store_true')
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--token-rate', type=float, default=500.)
+    parser.add_argument('--malformed-rate', type=float, default=0.)
+    parser.add_argument('--prefill-rate', type=float, default=None, help='Fake prompt processing speed, tokens/s')
+    parser.add_argument('--chunk-budget', type=int, default=1500, help='Token budget per chunk in chunked mode')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--endpoints', type=int, default=1, help='Fake servers to spread requests over with EndpointPool')
+    parser.add_argument('--hedge-after', type=float, default=None)
+    parser.add_argument('--output', help='Write the report to this JSON file as well as stdout')
+    args = parser.parse_args()
+
+    pairs = load_csv(args.csv, args.notes) if args.csv else make_dataset(args.notes, args.seed)
+    notes = [note for note, _ in pairs]
+    truths = [truth for _, truth in pairs]
+
+    report = {'commit': git_commit(), 'config': vars(args), 'modes': {}}
+    for mode in args.modes.split(','):
+        with ExitStack() as stack:
+            servers = [stack.enter_context(FakeOllama(args.latency, args.token_rate, args.malformed_rate,
+                                                      seed=args.seed + i, prefill_rate=args.prefill_rate)) for i in range(args.endpoints)]
+            if args.endpoints > 1:
+                client = EndpointPool([server.url for server in servers], max_concurrency=args.concurrency,
+                                      hedge_after=args.hedge_after)
+            else:
+                client = OllamaClient(host=servers[0].url)
+            stack.enter_context(client)
+            JSONcreate.repair_stats.clear()
+            JSONcreate.cascade_stats.clear()
+            start = time.perf_counter()
+            outputs, latencies, errors = run_mode(mode, args.model, notes, args, client)
+            wall = time.perf_counter() - start
+            server_stats = {key: sum(server.stats[key] for server in servers) for key in servers[0].stats}
+
+        scores = [compare_json(truth, json.loads(output)) if output is not None else 0.
+                  for truth, output in zip(truths, outputs)]
+        report['modes'][mode] = {
+            'notes': len(notes),
+            'errors': errors,
+            'wall_seconds': round(wall, 4),
+            'notes_per_second': round(len(notes) / wall, 3),
+            'p50_seconds': round(percentile(latencies, 50), 4),
+            'p95_seconds': round(percentile(latencies, 95), 4),
+            'p99_seconds': round(percentile(latencies, 99), 4),
+            'requests': server_stats['requests'],
+            'malformed_responses': server_stats['malformed'],
+            'aborted_streams': server_stats['aborted'],
+            'paths': dict(JSONcreate.repair_stats),
+            'accuracy': sum(scores) / len(scores),
+        }
+        if mode == 'cascade':
+            report['modes'][mode]['cascade'] = cascade_report()
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Compares JSONevalute.score with score_fast (process pool and schema=True) on a synthetic submission.
+
+    python benchmarks/bench_score.py --rows 10000 --processes 8
+"""
+
+import argparse
+import json
+import random
+import time
+
+import pandas as pd
+
+from synthetic import perturb
+from synthetic import random_record
+from JSONevalute import score
+from JSONevalute import score_fast
+from JSONvector import SchemaColumns
+from JSONvector import compare_json_vectorized
+
+def make_frames(rows, seed=0):
+    rng = random.Random(seed)
+    truths = [random_record(rng) for _ in range(rows)]
+    preds = [perturb(truth, rng) for truth in truths]
+    solution = pd.DataFrame({'id': range(rows), 'json': [json.dumps(t) for t in truths]})
+    submission = pd.DataFrame({'id': range(rows), 'json': [json.dumps(p, separators=(',', ':')) for p in preds]})
+    return solution, submission
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--processes', type=int, default=None)
+    args = parser.parse_args()
+
+    solution, submission = make_frames(args.rows)
+
+    start = time.perf_counter()
+    baseline = score(solution.copy(), submission.copy(), 'id')
+    baseline_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    fast = score_fast(solution, submission, 'id', processes=args.processes)
+    fast_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectorized = score_fast(solution, submission, 'id', schema=True)
+    vectorized_seconds = time.perf_counter() - start
+
+    # Scoring alone, once both sides are already encoded (e.g. a ground truth reused across experiments)
+    truths = SchemaColumns([json.loads(x) for x in solution['json']], {})
+    preds = SchemaColumns([json.loads(x) for x in submission['json']], truths.vocabulary)
+    start = time.perf_counter()
+    compare_json_vectorized(preds, truths)
+    encoded_seconds = time.perf_counter() - start
+
+    print(json.dumps({
+        'rows': args.rows,
+        'score': baseline,
+        'score_fast': fast,
+        'identical': baseline == fast,
+        'score_seconds': round(baseline_seconds, 4),
+        'score_fast_seconds': round(fast_seconds, 4),
+        'speedup': round(baseline_seconds / fast_seconds, 2),
+        'score_schema': vectorized,
+        'score_schema_abs_error': abs(baseline - vectorized),
+        'score_schema_seconds': round(vectorized_seconds, 4),
+        'schema_speedup': round(baseline_seconds / vectorized_seconds, 2),
+        'schema_encoded_seconds': round(encoded_seconds, 4),
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
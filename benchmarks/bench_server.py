@@ -0,0 +1,100 @@
+"""
+Load test for the JSONserver extraction service against the local fake Ollama server.
+
+Starts both in this process, fires `--requests` POST /extract calls from `--clients` concurrent clients and
+reports throughput, latency percentiles and how many requests were answered 200, 429 (queue full) or 504
+(deadline passed), plus the server's batching counters.
+
+    python benchmarks/bench_server.py --requests 200 --clients 32 --queue-size 16 --timeout 2
+"""
+
+import argparse
+import asyncio
+import http.client
+import json
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_pipeline import percentile
+from fake_ollama import FakeOllama
+from synthetic import make_dataset
+from JSONserver import ExtractionServer
+from LLMAPIs import OllamaClient
+
+def start_server(server, ready):
+    loop = asyncio.new_event_loop()
+    address = loop.run_until_complete(server.start('127.0.0.1', 0))
+    ready.append((loop, address))
+    loop.run_forever()
+
+def post(address, note, mode, timeout):
+    connection = http.client.HTTPConnection(*address, timeout=timeout + 30)
+    start = time.perf_counter()
+    connection.request('POST', '/extract', json.dumps({'note': note, 'mode': mode, 'timeout': timeout}),
+                       {'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    response.read()
+    connection.close()
+    return response.status, time.perf_counter() - start
+
+def get(address, path):
+    connection = http.client.HTTPConnection(*address)
+    connection.request('GET', path)
+    response = connection.getresponse()
+    return response.status, response.read().decode('utf-8')
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--mode', default='full', choices=['full', 'segment'])
+    parser.add_argument('--timeout', type=float, default=10., help='Per-request deadline sent to the server')
+    parser.add_argument('--queue-size', type=int, default=64)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--max-batch', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.1)
+    parser.add_argument('--token-rate', type=float, default=500.)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    notes = [note for note, _ in make_dataset(args.requests, args.seed)]
+    with FakeOllama(args.latency, args.token_rate, seed=args.seed) as fake, OllamaClient(host=fake.url) as client:
+        server = ExtractionServer('fake', args.queue_size, args.workers, args.max_batch, client=client, cache=False)
+        ready = []
+        thread = threading.Thread(target=start_server, args=(server, ready), daemon=True)
+        thread.start()
+        while not ready:
+            time.sleep(0.01)
+        loop, address = ready[0]
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.clients) as pool:
+            outcomes = list(pool.map(lambda note: post(address, note, args.mode, args.timeout), notes))
+        wall = time.perf_counter() - start
+
+        statuses = Counter(status for status, _ in outcomes)
+        latencies = [seconds for status, seconds in outcomes if status == 200]
+        _, health = get(address, '/health')
+        _, metrics = get(address, '/metrics')
+        asyncio.run_coroutine_threadsafe(server.stop(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        report = {
+            'config': vars(args),
+            'wall_seconds': round(wall, 4),
+            'ok_per_second': round(statuses[200] / wall, 3),
+            'statuses': dict(statuses),
+            'p50_seconds': percentile(latencies, 50),
+            'p95_seconds': percentile(latencies, 95),
+            'p99_seconds': percentile(latencies, 99),
+            'backend_requests': fake.stats['requests'],
+            'backend_aborted_streams': fake.stats['aborted'],
+            'server': dict(server.counters),
+            'health_after': json.loads(health),
+            'metrics_lines': len(metrics.splitlines()),
+        }
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Measures how long each mednotes subcommand takes to start, and which heavy dependencies it loads.
+
+Every case runs in a fresh interpreter on empty stdin, so the time is interpreter start plus imports. The
+`import ...` cases show what a worker pays for importing the modules directly.
+
+    python benchmarks/bench_startup.py --runs 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ['pandas', 'numpy', 'ollama', 'pydantic', 'httpx']
+
+CASES = {
+    'python': 'pass',
+    'mednotes --help': 'import mednotes',
+    'mednotes score': 'import mednotes; mednotes.main(["score"])',
+    'mednotes extract': 'import mednotes; mednotes.main(["extract"])',
+    'import JSONevalute': 'import JSONevalute',
+    'import JSONcreate': 'import JSONcreate',
+    'import JSONvector': 'import JSONvector',
+}
+
+REPORT = '; import sys, json; print(json.dumps([m for m in {heavy} if m in sys.modules]), file=sys.stderr)'
+
+def run(code):
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, '-c', code + REPORT.format(heavy=HEAVY)], cwd=ROOT,
+                             stdin=subprocess.DEVNULL, capture_output=True, text=True, check=True)
+    return time.perf_counter() - start, json.loads(process.stderr.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    report = {}
+    for name, code in CASES.items():
+        times, loaded = [], []
+        for _ in range(args.runs):
+            seconds, loaded = run(code)
+            times.append(seconds)
+        report[name] = {'median_seconds': round(statistics.median(times), 4), 'heavy_modules': loaded}
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Compares keeping results as minified JSON strings in a DataFrame with the JSONstore columnar store: size,
+re-scoring time and the round trip back to the original strings.
+
+    python benchmarks/bench_store.py --rows 100000
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from synthetic import perturb
+from synthetic import random_record
+from JSONstore import ResultStore
+from JSONstore import write_store
+from JSONvector import compare_json_vectorized
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    truths = [random_record(rng) for _ in range(args.rows)]
+    outputs = [json.dumps(perturb(truth, rng), separators=(',', ':')) for truth in truths]
+    frame = pd.DataFrame({'id': range(args.rows), 'json': outputs, 'seconds': 1.})
+
+    with tempfile.TemporaryDirectory() as directory:
+        truth_store = write_store(os.path.join(directory, 'truth'), truths)
+        start = time.perf_counter()
+        write_store(os.path.join(directory, 'results'), outputs, truth_store, frame['seconds'], frame['id'])
+        write_seconds = time.perf_counter() - start
+        store_bytes = sum(entry.stat().st_size for entry in os.scandir(os.path.join(directory, 'results')))
+
+        start = time.perf_counter()
+        from_strings = compare_json_vectorized(truths, [json.loads(output) for output in frame['json']])
+        strings_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        store = ResultStore(os.path.join(directory, 'results'))
+        from_store, _ = store.rescore(truth_store)
+        store_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        identical = all(a == b for a, b in zip(store.iter_json(), outputs))
+        round_trip_seconds = time.perf_counter() - start
+
+        summary = store.summary()
+
+    print(json.dumps({
+        'rows': args.rows,
+        'dataframe_bytes': int(frame.memory_usage(deep=True).sum()),
+        'store_bytes': store_bytes,
+        'write_seconds': round(write_seconds, 4),
+        'rescore_from_strings_seconds': round(strings_seconds, 4),
+        'rescore_from_store_seconds': round(store_seconds, 4),
+        'rescore_speedup': round(strings_seconds / store_seconds, 2),
+        'max_score_difference': float(np.abs(from_strings - from_store).max()),
+        'round_trip_identical': identical,
+        'round_trip_seconds': round(round_trip_seconds, 4),
+        'columnar_rows': summary['columnar'],
+        'raw_only_rows': summary['raw_only'],
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,292 @@
+"""
+A local stand-in for the Ollama chat API, for benchmarking without a GPU.
+
+It answers POST /api/chat (streaming and non-streaming) with recorded or synthetic responses. Latency, decode
+speed and the rate of malformed JSON are configurable. Synthetic answers are built from the note in the prompt
+with the JSONregex patterns plus keyword matching for visit_motivation and symptoms, and follow the `format`
+schema when one is sent.
+
+    python benchmarks/fake_ollama.py --port 11435 --latency 0.2 --token-rate 50
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from JSONregex import extract_patient_info
+from JSONregex import extract_vital_signs
+from JSONrepair import repair_json
+from JSONschema import SYMPTOMS
+from JSONschema import VISIT_MOTIVATIONS
+
+NOTE_PATTERNS = [
+    re.compile(r'<<<NOTES\n(.*)\nNOTES', re.S),
+    re.compile(r'Medical Note:\n(.*)', re.S),
+]
+PACKED_NOTE = re.compile(r'<<<NOTE id=(.*?)>>>\n(.*?)\n<<<END>>>', re.S)
+
+def synthetic_extraction(note):
+    """Builds a schema-shaped extraction for `note` without a model."""
+    data = {}
+    patient_info = extract_patient_info(note)
+    if patient_info:
+        data['patient_info'] = patient_info
+    lowered = note.lower()
+    for motivation in VISIT_MOTIVATIONS:
+        if motivation.lower() in lowered:
+            data['visit_motivation'] = motivation
+    symptoms = [symptom for symptom in SYMPTOMS if symptom.replace('_', ' ') in lowered]
+    if symptoms:
+        data['symptoms'] = symptoms
+    vital_signs = extract_vital_signs(note)
+    if vital_signs:
+        data['vital_signs'] = vital_signs
+    return data
+
+def shape_to_schema(data, schema):
+    """Projects an extraction onto the top-level properties of a `format` JSON schema."""
+    shaped = {}
+    for key in schema.get('properties', {}):
+        if key in data:
+            shaped[key] = data[key]
+        elif key in data.get('vital_signs', {}):
+            shaped[key] = data['vital_signs'][key]
+        elif key == 'visit_motivation':
+            shaped[key] = ''
+        elif key in ('symptoms', 'patient_info'):
+            shaped[key] = [] if key == 'symptoms' else {}
+        else:
+            shaped[key] = None
+    return shaped
+
+def malform(content, rng):
+    """Breaks a JSON answer the way models do: prose, fences, Python literals, or a cut-off tail."""
+    damage = rng.choice(['prose', 'fence', 'literal', 'truncate', 'garbage'])
+    if damage == 'prose':
+        return 'Here is the extracted data:\n' + content + '\nLet me know if you need anything else.'
+    if damage == 'fence':
+        return '```json\n' + content + '\n```'
+    if damage == 'literal':
+        return content[:-1] + ', "extra_note": None}'
+    if damage == 'truncate':
+        return content[:max(1, len(content) * 2 // 3)]
+    return 'I am unable to produce JSON for this note.'
+
+class _Server(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # Clients dropping kept-alive or cancelled connections is normal; a traceback would end up in the
+        # benchmark's JSON output
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+class FakeOllama:
+    """
+    Threaded HTTP server that imitates Ollama's /api/chat.
+
+    `latency` is a fixed per-request delay (model load plus prefill), `token_rate` is decode speed in tokens per
+    second (four characters per token), `prefill_rate` optionally adds prompt processing time in prompt tokens per
+    second, and `malformed_rate` is the share of answers that are broken. `responses`
+    optionally maps the SHA-256 of a user prompt to a recorded answer.
+
+    >>> with FakeOllama(latency=0.05) as server:
+    ...     client = OllamaClient(host=server.url)
+    """
+
+    def __init__(self, latency=0.05, token_rate=500., malformed_rate=0., responses=None, seed=0,
+                 host='127.0.0.1', port=0, prefill_rate=None):
+        self.latency = latency
+        self.token_rate = token_rate
+        self.prefill_rate = prefill_rate
+        self.malformed_rate = malformed_rate
+        self.responses = responses or {}
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'aborted': 0, 'malformed': 0, 'loads': 0}
+        self.server = _Server((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def answer(self, messages, schema):
+        """Returns the reply text for a chat request."""
+        system_prompt = next((m['content'] for m in messages if m['role'] == 'system'), '')
+        user_prompt = next((m['content'] for m in messages if m['role'] == 'user'), '')
+        recorded = self.responses.get(hashlib.sha256(user_prompt.encode('utf-8')).hexdigest())
+        if recorded is not None:
+            return recorded
+
+        if system_prompt.lstrip().startswith('You repair malformed JSON'):
+            try:
+                return json.dumps(repair_json(user_prompt))
+            except json.JSONDecodeError:
+                return '{}'
+
+        packed = PACKED_NOTE.findall(user_prompt)
+        if packed:
+            data = {'results': [{'id': note_id, 'extraction': synthetic_extraction(note)} for note_id, note in packed]}
+        else:
+            note = user_prompt
+            for pattern in NOTE_PATTERNS:
+                match = pattern.search(user_prompt)
+                if match:
+                    note = match.group(1)
+                    break
+            data = synthetic_extraction(note)
+        if isinstance(schema, dict):
+            data = shape_to_schema(data, schema)
+        content = json.dumps(data, ensure_ascii=False)
+
+        with self.lock:
+            broken = self.rng.random() < self.malformed_rate
+        if broken:
+            self._count('malformed')
+            with self.lock:
+                content = malform(content, self.rng)
+        return content
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                self._send_json({'models': []} if self.path.startswith('/api/') else {'status': 'Ollama is running'})
+
+            def do_POST(self):
+                if self.path != '/api/chat':
+                    self.send_error(404)
+                    return
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                fake._count('requests')
+                messages = request.get('messages') or []
+                if not messages:
+                    # Empty chat loads the model, as warm_up relies on
+                    fake._count('loads')
+                    time.sleep(fake.latency)
+                    self._send_json(self._chunk(request, '', True, 'load'))
+                    return
+
+                content = fake.answer(messages, request.get('format'))
+                prompt_tokens = sum(len(m.get('content', '')) for m in messages) // 4
+                time.sleep(fake.latency + (prompt_tokens / fake.prefill_rate if fake.prefill_rate else 0.))
+                if request.get('stream', True):
+                    self._stream(request, content, prompt_tokens)
+                else:
+                    time.sleep(len(content) / 4 / fake.token_rate)
+                    self._send_json(self._chunk(request, content, True, 'stop', prompt_tokens, len(content) // 4))
+
+            def _chunk(self, request, content, done, reason=None, prompt_tokens=0, tokens=0):
+                chunk = {'model': request.get('model', ''), 'created_at': '2024-01-01T00:00:00Z',
+                         'message': {'role': 'assistant', 'content': content}, 'done': done}
+                if done:
+                    chunk.update({
+                        'done_reason': reason,
+                        'total_duration': int((fake.latency + tokens / fake.token_rate) * 1e9),
+                        'load_duration': 0,
+                        'prompt_eval_count': prompt_tokens,
+                        'prompt_eval_duration': int(fake.latency * 1e9),
+                        'eval_count': tokens,
+                        'eval_duration': int(tokens / fake.token_rate * 1e9),
+                    })
+                return chunk
+
+            def _send_json(self, payload):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _stream(self, request, content, prompt_tokens):
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                pieces = [content[i:i + 4] for i in range(0, len(content), 4)]
+                try:
+                    for piece in pieces:
+                        time.sleep(1 / fake.token_rate)
+                        self._write_line(self._chunk(request, piece, False))
+                    self._write_line(self._chunk(request, '', True, 'stop', prompt_tokens, len(pieces)))
+                    self.wfile.write(b'0\r\n\r\n')
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client closed the stream early, which cancels generation on a real server
+                    fake._count('aborted')
+                    self.close_connection = True
+
+            def _write_line(self, payload):
+                line = json.dumps(payload).encode('utf-8') + b'\n'
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(line), line))
+                self.wfile.flush()
+
+        return Handler
+
+def load_responses(path):
+    """Reads recorded answers from JSONL lines of {"user_prompt": ..., "response": ...}."""
+    responses = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            responses[hashlib.sha256(record['user_prompt'].encode('utf-8')).hexdigest()] = record['response']
+    return responses
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11435)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--token-rate', type=float, default=500.)
+    parser.add_argument('--malformed-rate', type=float, default=0.)
+    parser.add_argument('--prefill-rate', type=float, default=None)
+    parser.add_argument('--responses', help='JSONL of recorded {"user_prompt", "response"} pairs')
+    args = parser.parse_args()
+
+    responses = load_responses(args.responses) if args.responses else None
+    server = FakeOllama(args.latency, args.token_rate, args.malformed_rate, responses, host=args.host, port=args.port,
+                        prefill_rate=args.prefill_rate)
+    print(f'Fake Ollama listening on {server.url}')
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        server.server.server_close()
+
+if __name__ == '__main__':
+    main()
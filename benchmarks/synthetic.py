@@ -0,0 +1,86 @@
+"""
+Synthetic records and notes that follow the extraction schema, for benchmarks that have no real dataset.
+"""
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from JSONschema import SYMPTOMS
+from JSONschema import VISIT_MOTIVATIONS
+
+VITAL_RANGES = {
+    'heart_rate': (50, 130, 'bpm', 'HR {} bpm'),
+    'respiratory_rate': (10, 30, 'breaths/min', 'RR {} breaths/min'),
+    'oxygen_saturation': (85, 100, '%', 'SpO2 {}%'),
+    'glucose_level': (70, 250, 'mg/dL', 'glucose {} mg/dL'),
+    'cholesterol_level': (120, 300, 'mg/dL', 'cholesterol {} mg/dL'),
+}
+
+def random_record(rng):
+    """Returns a ground-truth extraction with a random subset of fields present."""
+    record = {'patient_info': {'age': rng.randint(18, 90), 'gender': rng.choice(['Male', 'Female'])},
+              'visit_motivation': rng.choice(VISIT_MOTIVATIONS),
+              'symptoms': rng.sample(SYMPTOMS, rng.randint(1, 5))}
+    vital_signs = {}
+    if rng.random() < 0.8:
+        vital_signs['temperature'] = {'value': round(rng.uniform(36, 40), 1), 'unit': '°C'}
+    if rng.random() < 0.8:
+        vital_signs['blood_pressure'] = {'systolic': {'value': rng.randint(95, 170), 'unit': 'mmHg'},
+                                         'diastolic': {'value': rng.randint(55, 105), 'unit': 'mmHg'}}
+    for key, (low, high, unit, _) in VITAL_RANGES.items():
+        if rng.random() < 0.5:
+            vital_signs[key] = {'value': rng.randint(low, high), 'unit': unit}
+    if vital_signs:
+        record['vital_signs'] = vital_signs
+    return record
+
+def perturb(record, rng, rate=0.2):
+    """Returns a copy of `record` with some values nudged or dropped, like an imperfect extraction."""
+    record = {key: value for key, value in record.items() if rng.random() > rate / 4}
+    if 'patient_info' in record and rng.random() < rate:
+        record['patient_info'] = {**record['patient_info'], 'age': record['patient_info']['age'] + rng.choice([-1, 1])}
+    if 'visit_motivation' in record and rng.random() < rate:
+        record['visit_motivation'] = rng.choice(VISIT_MOTIVATIONS)
+    if 'symptoms' in record and rng.random() < rate:
+        record['symptoms'] = record['symptoms'][:-1] + [rng.choice(SYMPTOMS)]
+    if 'vital_signs' in record and rng.random() < rate:
+        vital_signs = dict(record['vital_signs'])
+        vital_signs.pop(rng.choice(list(vital_signs)))
+        record['vital_signs'] = vital_signs
+    return record
+
+def render_note(record, rng):
+    """Writes a short clinical note that states every field of `record`."""
+    lines = []
+    info = record.get('patient_info', {})
+    if info:
+        lines.append(f"{info.get('age', '')} yo {info.get('gender', '')[:1]} presents to clinic.")
+    if 'symptoms' in record:
+        lines.append('Reports ' + ', '.join(s.replace('_', ' ') for s in record['symptoms']) + '.')
+    vitals = record.get('vital_signs', {})
+    readings = []
+    if 'temperature' in vitals:
+        readings.append(f"Temp {vitals['temperature']['value']} °C")
+    if 'blood_pressure' in vitals:
+        bp = vitals['blood_pressure']
+        readings.append(f"BP {bp['systolic']['value']}/{bp['diastolic']['value']} mmHg")
+    for key, (_, _, _, template) in VITAL_RANGES.items():
+        if key in vitals:
+            readings.append(template.format(vitals[key]['value']))
+    if readings:
+        lines.append('Vitals: ' + ', '.join(readings) + '.')
+    if 'visit_motivation' in record:
+        lines.append(f"Assessment/Plan: {record['visit_motivation']}.")
+    return '\n'.join(lines)
+
+def make_dataset(n, seed=0):
+    """Returns n (note, ground-truth record) pairs."""
+    rng = random.Random(seed)
+    pairs = []
+    for _ in range(n):
+        record = random_record(rng)
+        pairs.append((render_note(record, rng), record))
+    return pairs
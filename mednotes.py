@@ -0,0 +1,223 @@
+"""
+Command-line entry point for extraction and scoring in shell pipelines.
+
+Reads newline-delimited input from stdin and writes one JSON line per input line to stdout as soon as it is
+ready. Input lines are either raw single-line notes or JSON objects with a "note" (or "Note") field; any other
+fields, such as "id" or "truth", are copied to the output, so extraction can be piped straight into scoring:
+
+    mednotes extract --model gpt-oss --concurrency 4 < notes.jsonl > results.jsonl
+    mednotes extract --model gpt-oss < notes.jsonl | mednotes score > scores.jsonl
+    mednotes serve --model gpt-oss --port 8080
+    mednotes grid --config grid.json --csv data/train.csv --limit 100 --output grid.csv
+
+Heavy dependencies load only on the subcommand that needs them: `score` needs just the standard library, and
+`extract` imports ollama and pydantic through JSONcreate when it starts.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+
+MODES = ['full', 'segment', 'hybrid', 'chunked', 'cascade']
+
+def read_records(lines):
+    """Yields a dict per non-empty line: JSON objects as they are, anything else as {"note": line}."""
+    for line in lines:
+        line = line.rstrip('\n')
+        if not line.strip():
+            continue
+        if line.lstrip().startswith('{'):
+            try:
+                yield json.loads(line)
+                continue
+            except json.JSONDecodeError:
+                pass
+        yield {'note': line}
+
+def write_record(record, out=sys.stdout):
+    out.write(json.dumps(record, ensure_ascii=False) + '\n')
+    out.flush()
+
+def _extractor(mode):
+    import JSONcreate
+    return {
+        'full': JSONcreate.get_json_full,
+        'segment': JSONcreate.get_json_segment,
+        'hybrid': JSONcreate.get_json_hybrid,
+        'chunked': JSONcreate.get_json_chunked,
+        'cascade': JSONcreate.get_json_cascade,
+    }[mode]
+
+def _client(hosts, timeout):
+    from LLMAPIs import EndpointPool
+    from LLMAPIs import OllamaClient
+    if not hosts:
+        return None
+    if len(hosts) == 1:
+        return OllamaClient(hosts[0], timeout)
+    return EndpointPool(hosts, timeout=timeout)
+
+def extract(args):
+    from JSONcreate import iter_batch
+    from LLMAPIs import set_cache
+
+    if args.cache:
+        from LLMcache import ResponseCache
+        set_cache(ResponseCache(args.cache))
+    if args.trace:
+        from LLMtrace import JSONLSink
+        from LLMtrace import add_sink
+        add_sink(JSONLSink(args.trace))
+
+    kwargs = {'stream': args.stream}
+    if args.mode == 'cascade':
+        kwargs['fast_model'] = args.fast_model
+    if args.mode == 'chunked':
+        kwargs['chunk_budget'] = args.chunk_budget
+    client = _client(args.host, args.timeout)
+    if client is not None:
+        kwargs['client'] = client
+
+    records = deque()
+    def notes():
+        # Records wait here until their result comes back, which iter_batch keeps to a bounded window
+        for record in read_records(sys.stdin):
+            note = record.pop('note', None)
+            if note is None:
+                note = record.pop('Note', '')
+            records.append(record)
+            yield note
+
+    failed = 0
+    try:
+        for result in iter_batch(args.model, notes(), args.concurrency, _extractor(args.mode), args.pack, **kwargs):
+            record = records.popleft()
+            record['json'] = json.loads(result.json) if result.ok else None
+            record['error'] = None if result.ok else f'{type(result.error).__name__}: {result.error}'
+            record['seconds'] = round(result.seconds, 4)
+            failed += not result.ok
+            write_record(record)
+    finally:
+        if client is not None:
+            client.close()
+    return 1 if failed and args.strict else 0
+
+def _as_object(value):
+    return json.loads(value) if isinstance(value, str) else value
+
+def score(args):
+    from JSONevalute import compare_json
+
+    total = count = 0
+    start = time.perf_counter()
+    for record in read_records(sys.stdin):
+        truth, prediction = record.get(args.truth_key), record.get(args.prediction_key)
+        try:
+            similarity = compare_json(_as_object(truth), _as_object(prediction)) if prediction is not None else 0.
+        except json.JSONDecodeError:
+            similarity = 0.
+        total += similarity
+        count += 1
+        write_record({key: record[key] for key in ('id', 'ID') if key in record} | {'score': similarity})
+    summary = {'rows': count, 'mean_score': total / count if count else None,
+               'seconds': round(time.perf_counter() - start, 4)}
+    print(json.dumps(summary), file=sys.stderr)
+    return 0
+
+def serve(args):
+    from JSONserver import ExtractionServer
+
+    client = _client(args.host, args.timeout)
+    kwargs = {} if client is None else {'client': client}
+    server = ExtractionServer(args.model, args.queue_size, args.workers, args.max_batch, args.batch_window,
+                              args.default_timeout, **kwargs)
+    print(f'Serving {args.model} on http://{args.bind}:{args.port}', file=sys.stderr)
+    try:
+        server.run(args.bind, args.port)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+def grid(args):
+    from JSONgrid import expand_grid
+    from JSONgrid import load_pairs
+    from JSONgrid import run_grid
+
+    # {"models": [...], "modes": ["full", "segment"], "prompts": {"default": null, "name": "system prompt"},
+    #  "formats": ["free", "json"]}
+    with open(args.config, encoding='utf-8') as f:
+        config = json.load(f)
+    prompts = config.get('prompts') or {'default': None}
+    variants = expand_grid(config['models'], config.get('modes', ['full']), list(prompts),
+                           config.get('formats', ['free']))
+    client = _client(args.host, args.timeout)
+    rows = run_grid(load_pairs(args.csv, args.limit), variants, prompts, client=client, cache=args.cache,
+                    concurrency=args.concurrency, early_stop=args.early_stop, output=args.output)
+    for row in rows:
+        write_record(row)
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='mednotes', description=__doc__.split('\n\n')[0].strip())
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    parser_extract = commands.add_parser('extract', help='Extract JSON for each note on stdin')
+    parser_extract.add_argument('--model', default='gpt-oss')
+    parser_extract.add_argument('--mode', choices=MODES, default='full')
+    parser_extract.add_argument('--fast-model', default='llama3.2', help='First model tried in cascade mode')
+    parser_extract.add_argument('--chunk-budget', type=int, default=1500, help='Token budget per chunk in chunked mode')
+    parser_extract.add_argument('--concurrency', type=int, default=4)
+    parser_extract.add_argument('--pack', type=int, default=1, help='Notes per request (packed prompts)')
+    parser_extract.add_argument('--host', action='append', help='Ollama URL; repeat to load-balance over several')
+    parser_extract.add_argument('--timeout', type=float, default=300)
+    parser_extract.add_argument('--stream', action='store_true', help='Stream responses and stop at the closing brace')
+    parser_extract.add_argument('--cache', help='Response cache directory (LLMcache)')
+    parser_extract.add_argument('--trace', help='Append per-call traces to this JSONL file')
+    parser_extract.add_argument('--strict', action='store_true', help='Exit with status 1 if any note failed')
+    parser_extract.set_defaults(run=extract)
+
+    parser_score = commands.add_parser('score', help='Score {"truth", "json"} lines with compare_json')
+    parser_score.add_argument('--truth-key', default='truth')
+    parser_score.add_argument('--prediction-key', default='json')
+    parser_score.set_defaults(run=score)
+
+    parser_serve = commands.add_parser('serve', help='Run the HTTP extraction service (JSONserver)')
+    parser_serve.add_argument('--model', default='gpt-oss')
+    parser_serve.add_argument('--bind', default='127.0.0.1')
+    parser_serve.add_argument('--port', type=int, default=8080)
+    parser_serve.add_argument('--host', action='append', help='Ollama URL; repeat to load-balance over several')
+    parser_serve.add_argument('--timeout', type=float, default=300, help='Ollama HTTP timeout')
+    parser_serve.add_argument('--queue-size', type=int, default=64)
+    parser_serve.add_argument('--workers', type=int, default=2, help='Batches sent to the model at once')
+    parser_serve.add_argument('--max-batch', type=int, default=4)
+    parser_serve.add_argument('--batch-window', type=float, default=0.01)
+    parser_serve.add_argument('--default-timeout', type=float, default=120., help='Request deadline in seconds')
+    parser_serve.set_defaults(run=serve)
+
+    parser_grid = commands.add_parser('grid', help='Run an experiment grid (JSONgrid) and print one row per variant')
+    parser_grid.add_argument('--config', required=True, help='JSON file with models, modes, prompts and formats')
+    parser_grid.add_argument('--csv', required=True, help='CSV with Note and json columns')
+    parser_grid.add_argument('--limit', type=int, default=None)
+    parser_grid.add_argument('--output', help='Also write the results table to this CSV file')
+    parser_grid.add_argument('--host', action='append', help='Ollama URL; repeat to load-balance over several')
+    parser_grid.add_argument('--timeout', type=float, default=300)
+    parser_grid.add_argument('--concurrency', type=int, default=4)
+    parser_grid.add_argument('--cache', default='.llmcache', help='Response cache shared by all variants')
+    parser_grid.add_argument('--early-stop', action='store_true', help='Stop variants behind the first one')
+    parser_grid.set_defaults(run=grid)
+
+    args = parser.parse_args(argv)
+    if args.command == 'extract' and args.pack > 1 and args.mode in ('cascade', 'chunked'):
+        parser.error(f'--pack cannot be used with --mode {args.mode}')
+    try:
+        return args.run(args)
+    except BrokenPipeError:
+        # The reader went away (e.g. `| head`); point stdout at devnull so the exit flush does not fail again
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+
+if __name__ == '__main__':
+    sys.exit(main())